@@ -4,17 +4,70 @@
 이 파일은 웹 인터페이스를 제공하는 메인 애플리케이션입니다.
 """
 
-from flask import Flask, render_template, request, jsonify
+import time
+_import_started = time.perf_counter()  # 시작 시간 측정 기준 (StartupTimer)
+
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from washing_system import WashingMachineSystem
+from database import EXPORT_SOURCES
+from models import MachineType, parse_fleet
+from state_server import StateClient, parse_address
+from telemetry import TelemetryStore
+from profiler import RequestProfiler, StartupTimer
+from idempotency import IdempotencyCache
+from notifier import NotificationDispatcher
+from datetime import datetime
+import csv
+import hmac
+import io
+import json
+import os
 import threading
-import time
+
+# 첫 응답 전에 하지 않아도 되는 작업(백그라운드 스레드, 밀린 완료 처리)은
+# 첫 응답을 보낸 뒤 또는 이 시간(초)이 지난 뒤 시작합니다 (콜드 스타트 단축)
+DEFERRED_START_SECONDS = 5
+
+# 시작 경로 단계별 시간 기록 (/api/startup)
+startup = StartupTimer(_import_started)
+startup.mark("모듈 로드")
 
 # Flask 애플리케이션 초기화
 app = Flask(__name__)
 
-# 세탁기 시스템 인스턴스 생성 (3대의 세탁기)
-# 세탁기 개수는 여기서 변경 가능합니다
-washing_system = WashingMachineSystem(num_machines=3)
+# 요청 프로파일러 (PROFILE_SAMPLE_RATE / PROFILE_TOKEN 환경 변수로 켤 때만 동작)
+profiler = RequestProfiler.from_env()
+profiler.init_app(app)
+
+# STATE_SERVER 환경 변수가 있으면 별도 상태 서버 프로세스에 접속합니다
+# (예: STATE_SERVER=127.0.0.1:7070 또는 STATE_SERVER=unix:/tmp/washing.sock)
+# 이 경우 웹 프로세스는 상태를 갖지 않으므로 여러 대로 늘릴 수 있습니다
+# 상태 서버에 STATE_SERVER_TOKEN을 설정했다면 웹 프로세스에도 같은 값을 설정해야 합니다
+STATE_SERVER = os.environ.get('STATE_SERVER', '').strip()
+
+if STATE_SERVER:
+    washing_system = StateClient(parse_address(STATE_SERVER), token=os.environ.get('STATE_SERVER_TOKEN'))
+else:
+    # 세탁기 시스템 인스턴스 생성 (3대의 세탁기)
+    # 세탁기 개수는 여기서 변경 가능합니다
+    # MACHINE_FLEET 환경 변수로 세탁기/건조기 구성과 용량을 지정할 수 있습니다
+    # (예: MACHINE_FLEET="washer:8,washer:12,dryer:10")
+    washing_system = WashingMachineSystem(
+        num_machines=3,
+        fleet=parse_fleet(os.environ.get('MACHINE_FLEET', '')) or None
+    )
+startup.mark("시스템 초기화")
+
+# POST 요청 재시도 중복 방지 (Idempotency-Key 헤더)
+# 상태 서버를 쓰는 경우 키를 상태 서버에 저장하므로 재시도가 다른 웹 프로세스로 가도 중복 처리되지 않습니다
+idempotency = IdempotencyCache.from_env(washing_system)
+idempotency.init_app(app)
+
+# 외부 채널 알림 발송 (NOTIFY_WEBHOOK_URL / NOTIFY_SMTP_HOST / NOTIFY_FILE 환경 변수로 켤 때만 동작)
+# 상태 서버를 쓰는 경우 알림은 상태 서버 프로세스에서 보냅니다
+notifier = NotificationDispatcher([]) if STATE_SERVER else NotificationDispatcher.from_env(washing_system.db)
+if notifier.enabled:
+    washing_system.notifier = notifier
 
 
 def background_status_checker():
@@ -32,9 +85,56 @@ def background_status_checker():
             time.sleep(10)
 
 
-# 백그라운드 스레드 시작
-background_thread = threading.Thread(target=background_status_checker, daemon=True)
-background_thread.start()
+# 세탁기 텔레메트리 수집기 (메모리 링 버퍼 + 주기적 다운샘플링, 스레드는 나중에 시작)
+telemetry = TelemetryStore(washing_system)
+
+_deferred_started = threading.Event()
+_deferred_lock = threading.Lock()
+
+
+def start_deferred_work(trigger: str):
+    """
+    첫 응답 이후로 미룬 작업 시작 (한 번만 실행)
+    
+    멈춰 있던 동안 밀린 완료 처리/예약 만료를 한 번에 처리하고
+    백그라운드 상태 확인 스레드와 텔레메트리 스레드를 시작합니다.
+    
+    Args:
+        trigger: 시작 계기 (시작 시간 보고에 단계 이름으로 기록)
+    """
+    with _deferred_lock:
+        if _deferred_started.is_set():
+            return
+        _deferred_started.set()
+    startup.mark(trigger)
+    
+    # 상태 서버를 쓰는 경우 상태 서버가 직접 확인합니다
+    if not STATE_SERVER:
+        try:
+            caught_up = washing_system.catch_up()
+            startup.mark(f"밀린 처리 (완료 {caught_up['completed']}대, 만료 {caught_up['expired']}건)")
+        except Exception as e:
+            print(f"밀린 상태 처리 중 오류 발생: {e}")
+        background_thread = threading.Thread(target=background_status_checker, daemon=True)
+        background_thread.start()
+    
+    telemetry.start()
+    notifier.start()
+    print(startup.summary())
+
+
+@app.after_request
+def schedule_deferred_work(response):
+    """첫 응답을 다 보낸 뒤 미룬 작업 시작"""
+    if not _deferred_started.is_set():
+        response.call_on_close(lambda: start_deferred_work("첫 응답"))
+    return response
+
+
+# 요청이 오지 않아도 일정 시간 뒤에는 시작
+_deferred_timer = threading.Timer(DEFERRED_START_SECONDS, start_deferred_work, args=("요청 없이 대기",))
+_deferred_timer.daemon = True
+_deferred_timer.start()
 
 
 @app.route('/')
@@ -60,6 +160,28 @@ def get_status():
     return jsonify(status)
 
 
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    대시보드 통합 조회 API (상태 + 알림 + 대기 순서 + 내 세탁기)
+    
+    메인 페이지가 주기적으로 호출하는 단일 엔드포인트입니다.
+    ETag를 붙여 내용이 같으면 304 응답으로 전송량을 줄입니다.
+    
+    쿼리 파라미터:
+        - user_name: 사용자 이름 (선택)
+    
+    Returns:
+        JSON 형식의 대시보드 정보
+    """
+    user_name = request.args.get('user_name', '').strip() or None
+    
+    response = jsonify(washing_system.get_dashboard(user_name))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
 @app.route('/api/start', methods=['POST'])
 def start_washing():
     """
@@ -67,14 +189,19 @@ def start_washing():
     
     요청 데이터:
         - user_name: 사용자 이름
-        - duration_minutes: 세탁 소요 시간 (선택, 기본 30분)
+        - duration_minutes: 세탁 소요 시간 (선택, 기본 세탁 30분 / 건조 40분)
+        - machine_type: 기기 종류 "세탁기" 또는 "건조기" (선택, 기본 세탁기)
+        - load_kg: 세탁물 무게 kg (선택, 이 용량 이상인 기기만 배정)
+        - then_dry: 세탁 후 건조기 이어서 배정 여부 (선택)
     
     Returns:
         JSON 형식의 결과 정보
     """
     data = request.get_json()
     user_name = data.get('user_name', '').strip()
-    duration_minutes = data.get('duration_minutes', 30)
+    duration_minutes = data.get('duration_minutes')
+    machine_type = data.get('machine_type', MachineType.WASHER.value)
+    load_kg = data.get('load_kg') or 0
     
     if not user_name:
         return jsonify({
@@ -82,13 +209,21 @@ def start_washing():
             "message": "사용자 이름을 입력해주세요."
         }), 400
     
-    if duration_minutes <= 0 or duration_minutes > 120:
+    if duration_minutes is not None and (duration_minutes <= 0 or duration_minutes > 120):
         return jsonify({
             "success": False,
             "message": "세탁 시간은 1분 이상 120분 이하여야 합니다."
         }), 400
     
-    result = washing_system.start_washing(user_name, duration_minutes)
+    if not isinstance(load_kg, int) or load_kg < 0:
+        return jsonify({
+            "success": False,
+            "message": "세탁물 무게는 0 이상의 정수(kg)여야 합니다."
+        }), 400
+    
+    result = washing_system.start_washing(
+        user_name, duration_minutes, machine_type, load_kg, bool(data.get('then_dry'))
+    )
     return jsonify(result)
 
 
@@ -177,6 +312,31 @@ def clear_notifications():
     })
 
 
+@app.route('/api/notifications/dispatcher', methods=['GET'])
+def get_dispatcher_status():
+    """
+    외부 채널 알림 발송 상태 조회 API
+    
+    쿼리 파라미터:
+        - limit: 조회할 최근 데드레터 개수 (선택, 기본 50)
+    
+    Returns:
+        JSON 형식의 발송 통계와 최근 데드레터 목록 (발송이 꺼져 있으면 404)
+    """
+    if not notifier.enabled:
+        return jsonify({
+            "success": False,
+            "message": "알림 발송 채널이 설정되어 있지 않습니다."
+        }), 404
+    
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        "success": True,
+        "stats": notifier.get_stats(),
+        "dead_letters": washing_system.db.get_dead_letters(limit)
+    })
+
+
 @app.route('/api/reservation/cancel', methods=['POST'])
 def cancel_reservation():
     """
@@ -201,9 +361,253 @@ def cancel_reservation():
     return jsonify(result)
 
 
-if __name__ == '__main__':
-    import os
+@app.route('/api/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """
+    세탁기 텔레메트리 수집 API (세탁기 → 서버)
+    
+    TELEMETRY_TOKEN 환경 변수가 설정되어 있어야 하며, 세탁기는 X-Telemetry-Token 헤더로 같은 값을 보내야 합니다.
+    (설정되어 있지 않으면 아무도 세탁 종료 시간을 바꾸지 못하도록 수집을 거부합니다)
+    
+    요청 데이터:
+        - readings: 보고값 리스트 (요청 본문이 리스트이면 그대로 사용)
+            - machine_id: 세탁기 번호
+            - progress: 진행률 0~100 (선택)
+            - remaining_seconds: 남은 시간(초) (선택)
+            - timestamp: 측정 시간, epoch 초 (선택)
+    
+    Returns:
+        JSON 형식의 수집 결과 (202 Accepted)
+    """
+    token = os.environ.get('TELEMETRY_TOKEN', '')
+    if not token or not hmac.compare_digest(request.headers.get('X-Telemetry-Token', '').encode('utf-8'),
+                                            token.encode('utf-8')):
+        return jsonify({
+            "success": False,
+            "message": "텔레메트리 전송 권한이 없습니다."
+        }), 403
+    
+    data = request.get_json(silent=True)
+    readings = data if isinstance(data, list) else (data or {}).get('readings')
+    
+    if not isinstance(readings, list):
+        return jsonify({
+            "success": False,
+            "message": "보고값 목록(readings)이 필요합니다."
+        }), 400
+    
+    accepted = telemetry.ingest(readings)
+    return jsonify({
+        "success": True,
+        "accepted": accepted,
+        "rejected": len(readings) - accepted
+    }), 202
+
+
+@app.route('/api/telemetry/<int:machine_id>', methods=['GET'])
+def get_telemetry(machine_id):
+    """
+    세탁기 최근 텔레메트리 조회 API
+    
+    쿼리 파라미터:
+        - limit: 최대 조회 개수 (선택, 기본 60)
+    
+    Returns:
+        JSON 형식의 최근 보고값 목록
+    """
+    limit = request.args.get('limit', 60, type=int)
+    return jsonify({
+        "success": True,
+        "machine_id": machine_id,
+        "readings": telemetry.recent(machine_id, limit)
+    })
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """
+    최근 요청 프로파일 목록 조회 API
     
+    쿼리 파라미터:
+        - limit: 최대 조회 개수 (선택, 기본 50)
+    
+    Returns:
+        JSON 형식의 프로파일 목록 (프로파일러가 꺼져 있으면 404)
+    """
+    if not profiler.enabled or not profiler.is_authorized():
+        return jsonify({
+            "success": False,
+            "message": "프로파일러가 활성화되어 있지 않습니다."
+        }), 404
+    
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        "success": True,
+        "profiles": profiler.list_profiles(limit)
+    })
+
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """
+    요청 프로파일 요약 조회 API
+    
+    쿼리 파라미터:
+        - sort: 정렬 기준 (선택, cumulative / tottime / calls, 기본 cumulative)
+    
+    Returns:
+        pstats 텍스트 요약 (파일이 없으면 404)
+    """
+    if not profiler.enabled or not profiler.is_authorized():
+        return jsonify({
+            "success": False,
+            "message": "프로파일러가 활성화되어 있지 않습니다."
+        }), 404
+    
+    report = profiler.render_profile(name, request.args.get('sort', 'cumulative'))
+    if report is None:
+        return jsonify({
+            "success": False,
+            "message": "존재하지 않는 프로파일입니다."
+        }), 404
+    return report, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """
+    데이터 내보내기 API (스트리밍)
+    
+    행을 묶음 단위로 읽어 바로 전송하므로 행 수와 관계없이 메모리 사용량이 일정합니다.
+    관리자용 기능이므로 EXPORT_TOKEN 환경 변수가 설정되어 있고 X-Export-Token 헤더가 같아야 합니다.
+    (설정되어 있지 않으면 내보내기를 허용하지 않습니다)
+    
+    경로 파라미터:
+        - table: sessions (세탁 기록), reservations (예약 기록), notifications (알림)
+    
+    쿼리 파라미터:
+        - format: ndjson (기본) 또는 csv
+        - since: 이 시간 이후의 행만 (ISO 8601, 선택)
+        - until: 이 시간 이전의 행만 (ISO 8601, 선택)
+    
+    Returns:
+        NDJSON 또는 CSV 스트리밍 응답
+    """
+    token = os.environ.get('EXPORT_TOKEN', '')
+    if not token or not hmac.compare_digest(request.headers.get('X-Export-Token', '').encode('utf-8'),
+                                            token.encode('utf-8')):
+        return jsonify({
+            "success": False,
+            "message": "내보내기 권한이 없습니다."
+        }), 403
+    
+    if table not in EXPORT_SOURCES:
+        return jsonify({
+            "success": False,
+            "message": f"내보낼 수 없는 항목입니다. ({', '.join(EXPORT_SOURCES)})"
+        }), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({
+            "success": False,
+            "message": "형식은 ndjson 또는 csv만 가능합니다."
+        }), 400
+    
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "message": "시간 형식이 올바르지 않습니다. (예: 2024-01-01T12:00:00)"
+        }), 400
+    
+    db = getattr(washing_system, 'db', None)
+    if db is None:
+        return jsonify({
+            "success": False,
+            "message": "상태 서버 모드에서는 상태 서버 호스트에서 내보내기를 실행해주세요."
+        }), 501
+    
+    rows = db.iter_export(table, since, until)
+    columns = EXPORT_SOURCES[table][3]
+    
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        writer.writeheader()
+        for i, row in enumerate(rows, 1):
+            writer.writerow(row)
+            # 일정 개수마다 버퍼를 비워 전송
+            if i % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={table}.{export_format}'}
+    )
+
+
+@app.route('/api/startup', methods=['GET'])
+def get_startup_report():
+    """
+    서버 시작 시간 보고 API
+    
+    모듈 로드, 시스템 초기화, 첫 응답, 밀린 처리 단계별 소요 시간을 반환합니다.
+    
+    Returns:
+        JSON 형식의 단계별 소요 시간(ms)
+    """
+    return jsonify({
+        "success": True,
+        "deferred_work_started": _deferred_started.is_set(),
+        **startup.report()
+    })
+
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """
+    과거 시점 상태 조회 API (이벤트 저널 재생)
+    
+    쿼리 파라미터:
+        - at: 조회할 시점 (ISO 8601 형식, 예: 2024-01-01T12:00:00)
+    
+    Returns:
+        JSON 형식의 해당 시점 세탁기 상태와 예약 목록
+    """
+    at = request.args.get('at', '').strip()
+    
+    try:
+        when = datetime.fromisoformat(at) if at else datetime.now()
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "message": "시간 형식이 올바르지 않습니다. (예: 2024-01-01T12:00:00)"
+        }), 400
+    
+    state = washing_system.get_state_at(when)
+    return jsonify({
+        "success": True,
+        **state
+    })
+
+
+if __name__ == '__main__':
     # 환경 변수에서 포트 가져오기 (호스팅 플랫폼용)
     port = int(os.environ.get('PORT', 5000))
     
@@ -7,10 +7,121 @@ SQLite를 사용하여 세탁기 상태, 예약, 알림 정보를 영구 저장
 
 import sqlite3
 import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Iterator, List, Optional, Dict
 from contextlib import contextmanager
 
+# UPDATE/DELETE ... RETURNING 지원 여부 (SQLite 3.35 이상)
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# 사용자 이름 → ID 캐시 최대 크기 (LRU)
+USER_CACHE_SIZE = 10000
+
+# 데이터베이스 스키마 버전 (테이블/인덱스/변환 작업을 바꾸면 올려야 합니다)
+# system_config에 저장된 값과 같으면 시작 시 DDL과 변환 작업을 모두 건너뜁니다
+SCHEMA_VERSION = 12
+
+# user_id를 참조하는 테이블 정의 (기존 user_name 컬럼 변환에도 사용)
+USER_TABLES = {
+    "machines": ("""
+        CREATE TABLE IF NOT EXISTS machines (
+            machine_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            user_id INTEGER REFERENCES users (id),
+            start_time TEXT,
+            end_time TEXT,
+            duration_minutes INTEGER DEFAULT 0,
+            machine_type TEXT NOT NULL DEFAULT '세탁기',
+            capacity_kg INTEGER NOT NULL DEFAULT 10,
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            load_kg INTEGER NOT NULL DEFAULT 0,
+            then_dry INTEGER NOT NULL DEFAULT 0
+        )
+    """, ["machine_id", "status", "start_time", "end_time", "duration_minutes"]),
+    "reservations": ("""
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            reservation_time TEXT NOT NULL,
+            expiry_time TEXT NOT NULL,
+            machine_type TEXT NOT NULL DEFAULT '세탁기',
+            load_kg INTEGER NOT NULL DEFAULT 0,
+            then_dry INTEGER NOT NULL DEFAULT 0
+        )
+    """, ["id", "reservation_time", "expiry_time"]),
+    "notifications": ("""
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            message TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            read INTEGER DEFAULT 0
+        )
+    """, ["id", "message", "timestamp", "read"]),
+}
+
+# 기기 종류/용량 컬럼 (이 컬럼이 없던 데이터베이스에는 ALTER TABLE로 추가)
+MATCHING_COLUMNS = {
+    "machines": [
+        ("machine_type", "TEXT NOT NULL DEFAULT '세탁기'"),
+        ("capacity_kg", "INTEGER NOT NULL DEFAULT 10"),
+        ("usage_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("load_kg", "INTEGER NOT NULL DEFAULT 0"),
+        ("then_dry", "INTEGER NOT NULL DEFAULT 0"),
+    ],
+    "reservations": [
+        ("machine_type", "TEXT NOT NULL DEFAULT '세탁기'"),
+        ("load_kg", "INTEGER NOT NULL DEFAULT 0"),
+        ("then_dry", "INTEGER NOT NULL DEFAULT 0"),
+    ],
+}
+
+# user_id를 사용자 이름으로 되돌려 조회하는 SELECT 절 (기존 반환 형식 유지)
+MACHINE_SELECT = """
+    SELECT m.machine_id, m.status, u.name AS user_name, m.start_time, m.end_time, m.duration_minutes,
+           m.machine_type, m.capacity_kg, m.usage_count, m.load_kg, m.then_dry
+    FROM machines m LEFT JOIN users u ON u.id = m.user_id
+"""
+RESERVATION_SELECT = """
+    SELECT r.id, u.name AS user_name, r.reservation_time, r.expiry_time,
+           r.machine_type, r.load_kg, r.then_dry
+    FROM reservations r JOIN users u ON u.id = r.user_id
+"""
+NOTIFICATION_SELECT = """
+    SELECT n.id, u.name AS user_name, n.message, n.timestamp, n.read
+    FROM notifications n JOIN users u ON u.id = n.user_id
+"""
+
+# 내보내기 대상: 이름 → (키셋 페이지 키, 시간 필터 컬럼, SELECT 절, 출력 컬럼)
+# 세탁 기록과 예약 기록은 이벤트 저널에서, 알림은 알림 테이블에서 가져옵니다
+EXPORT_SOURCES = {
+    "sessions": ("e.seq", "e.timestamp", """
+        SELECT e.seq,
+               json_extract(e.payload, '$.machine_id') AS machine_id,
+               json_extract(e.payload, '$.machine_type') AS machine_type,
+               json_extract(e.payload, '$.user_name') AS user_name,
+               json_extract(e.payload, '$.start_time') AS start_time,
+               json_extract(e.payload, '$.end_time') AS end_time,
+               json_extract(e.payload, '$.duration_minutes') AS duration_minutes,
+               json_extract(e.payload, '$.reservation_id') AS reservation_id
+        FROM events e
+        WHERE e.event_type = 'WashStarted'
+    """, ["seq", "machine_id", "machine_type", "user_name", "start_time", "end_time",
+          "duration_minutes", "reservation_id"]),
+    "reservations": ("e.seq", "e.timestamp", """
+        SELECT e.seq,
+               json_extract(e.payload, '$.reservation_id') AS reservation_id,
+               json_extract(e.payload, '$.user_name') AS user_name,
+               json_extract(e.payload, '$.reservation_time') AS reservation_time,
+               json_extract(e.payload, '$.expiry_time') AS expiry_time
+        FROM events e
+        WHERE e.event_type = 'Reserved'
+    """, ["seq", "reservation_id", "user_name", "reservation_time", "expiry_time"]),
+    "notifications": ("n.id", "n.timestamp", NOTIFICATION_SELECT + " WHERE 1 = 1",
+                      ["id", "user_name", "message", "timestamp", "read"]),
+}
+
 
 class Database:
     """
@@ -28,6 +139,8 @@ class Database:
         """
         self.db_path = db_path
         self.local = threading.local()  # 스레드별 연결 저장
+        self._user_cache: "OrderedDict[str, int]" = OrderedDict()  # 사용자 이름 → ID (LRU)
+        self._user_cache_lock = threading.Lock()
         self._init_database()
     
     def _get_connection(self) -> sqlite3.Connection:
@@ -52,87 +165,286 @@ class Database:
         데이터베이스 커서 컨텍스트 매니저
         
         자동으로 커밋과 롤백을 처리합니다.
+        transaction() 안에서 호출되면 커밋하지 않고 바깥 트랜잭션에 포함됩니다.
         """
         conn = self._get_connection()
         cursor = conn.cursor()
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
         try:
             yield cursor
-            conn.commit()
+            if depth == 0:
+                conn.commit()
         except Exception as e:
-            conn.rollback()
+            if depth == 0:
+                conn.rollback()
+                # 롤백된 사용자 생성이 캐시에 남지 않도록 비움
+                with self._user_cache_lock:
+                    self._user_cache.clear()
             raise e
         finally:
+            self.local.depth = depth
             cursor.close()
     
+    @contextmanager
+    def transaction(self):
+        """
+        여러 메서드 호출을 하나의 트랜잭션으로 묶는 컨텍스트 매니저
+        
+        시작할 때 쓰기 잠금을 잡으므로(BEGIN IMMEDIATE) 다른 프로세스의 쓰기와 섞이지 않습니다.
+        안에서 호출한 메서드의 변경은 블록이 끝날 때 한 번에 커밋됩니다.
+        """
+        with self.get_cursor() as cursor:
+            if not cursor.connection.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
+    
     def _init_database(self):
-        """데이터베이스 테이블 초기화"""
+        """
+        데이터베이스 테이블 초기화
+        
+        스키마 버전이 최신이면 조회 한 번으로 끝납니다 (콜드 스타트 단축).
+        """
         with self.get_cursor() as cursor:
-            # 세탁기 테이블
+            if self._schema_is_current(cursor):
+                return
+            
+            # 사용자 테이블 (이름을 정수 ID로 관리)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS machines (
-                    machine_id INTEGER PRIMARY KEY,
-                    status TEXT NOT NULL,
-                    user_name TEXT,
-                    start_time TEXT,
-                    end_time TEXT,
-                    duration_minutes INTEGER DEFAULT 0
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL UNIQUE
                 )
             """)
             
-            # 예약 테이블
+            # 세탁기, 예약, 알림 테이블 (사용자는 user_id로 참조)
+            for create_sql, _ in USER_TABLES.values():
+                cursor.execute(create_sql)
+            
+            # 이전 버전의 user_name 컬럼을 user_id로 변환
+            self._migrate_user_names(cursor)
+            
+            # 기기 종류/용량 컬럼이 없던 테이블에 추가
+            self._add_matching_columns(cursor)
+            
+            # 시스템 설정 테이블 (세탁기 개수 등)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS reservations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_name TEXT NOT NULL,
-                    reservation_time TEXT NOT NULL,
-                    expiry_time TEXT NOT NULL
+                CREATE TABLE IF NOT EXISTS system_config (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+            """)
+            
+            # 자주 쓰는 조회 조건 인덱스
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_machines_status ON machines (status, end_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_machines_type ON machines (machine_type, capacity_kg, end_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservations_time ON reservations (reservation_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservations_expiry ON reservations (expiry_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservations_user ON reservations (user_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_reservations_type ON reservations (machine_type, reservation_time)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id, read)")
+            
+            # 이벤트 저널 테이블 (추가 전용)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp)")
+            
+            # 텔레메트리 테이블 (세탁기 보고값을 1분 단위로 다운샘플링)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS telemetry (
+                    machine_id INTEGER NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    samples INTEGER NOT NULL,
+                    avg_progress REAL,
+                    min_remaining_seconds INTEGER,
+                    PRIMARY KEY (machine_id, bucket_start)
                 )
             """)
             
-            # 알림 테이블
+            # 상태 스냅샷 테이블 (seq 시점까지의 이벤트가 반영된 상태)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS notifications (
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    seq INTEGER PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            """)
+            
+            # 멱등성 키 테이블 (POST 요청 재시도 시 처음 응답을 다시 보내기 위해 저장)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency_keys (created_at)")
+            
+            # 외부 채널(웹훅/이메일 등)로 끝내 보내지 못한 알림 (notifier.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dead_letters (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_name TEXT NOT NULL,
+                    channel TEXT NOT NULL,
+                    user_id INTEGER NOT NULL REFERENCES users (id),
                     message TEXT NOT NULL,
                     timestamp TEXT NOT NULL,
-                    read INTEGER DEFAULT 0
+                    attempts INTEGER NOT NULL,
+                    error TEXT,
+                    failed_at TEXT NOT NULL
                 )
             """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_dead_letters_failed ON dead_letters (failed_at)")
             
-            # 시스템 설정 테이블 (세탁기 개수 등)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS system_config (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL
-                )
+                INSERT OR REPLACE INTO system_config (key, value)
+                VALUES ('schema_version', ?)
+            """, (str(SCHEMA_VERSION),))
+    
+    def _schema_is_current(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        저장된 스키마 버전이 SCHEMA_VERSION과 같은지 확인
+        
+        Returns:
+            최신 여부 (system_config 테이블이 없는 새 데이터베이스면 False)
+        """
+        try:
+            cursor.execute("SELECT value FROM system_config WHERE key = 'schema_version'")
+        except sqlite3.OperationalError:
+            return False
+        row = cursor.fetchone()
+        return row is not None and row['value'] == str(SCHEMA_VERSION)
+    
+    def _migrate_user_names(self, cursor: sqlite3.Cursor):
+        """
+        user_name 문자열 컬럼이 남아 있는 테이블을 user_id 정수 컬럼으로 변환
+        
+        기존 데이터베이스에서 한 번만 실행되며, 테이블을 새 형식으로 다시 만들어
+        기존 ID(예약 번호 등)를 그대로 유지한 채 데이터를 옮깁니다.
+        """
+        for table, (create_sql, columns) in USER_TABLES.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            if 'user_name' not in [row['name'] for row in cursor.fetchall()]:
+                continue
+            
+            if not cursor.connection.in_transaction:
+                cursor.execute("BEGIN")
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO users (name)
+                SELECT DISTINCT user_name FROM {table} WHERE user_name IS NOT NULL
+            """)
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            cursor.execute(create_sql)
+            column_list = ", ".join(columns)
+            cursor.execute(f"""
+                INSERT INTO {table} ({column_list}, user_id)
+                SELECT {column_list}, (SELECT id FROM users WHERE name = old.user_name)
+                FROM {table}_old old
             """)
+            cursor.execute(f"DROP TABLE {table}_old")
+    
+    def _add_matching_columns(self, cursor: sqlite3.Cursor):
+        """
+        기기 종류/용량 컬럼이 없는 테이블에 컬럼 추가
+        
+        새로 추가한 사용 횟수는 이벤트 저널의 세탁 시작 기록 수로 채워
+        저널 재생 결과와 일치하게 합니다.
+        """
+        for table, columns in MATCHING_COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row['name'] for row in cursor.fetchall()}
+            for name, definition in columns:
+                if name not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            
+            if table == 'machines' and 'usage_count' not in existing:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'")
+                if cursor.fetchone():
+                    cursor.execute("""
+                        UPDATE machines SET usage_count = (
+                            SELECT COUNT(*) FROM events
+                            WHERE event_type = 'WashStarted'
+                              AND json_extract(payload, '$.machine_id') = machines.machine_id
+                        )
+                    """)
+    
+    def _get_user_id(self, cursor: sqlite3.Cursor, user_name: str, create: bool = True) -> Optional[int]:
+        """
+        사용자 이름을 정수 ID로 변환 (LRU 캐시 사용)
+        
+        Args:
+            cursor: 현재 트랜잭션의 커서
+            user_name: 사용자 이름
+            create: 없는 사용자면 새로 만들지 여부
+        
+        Returns:
+            사용자 ID. create=False이고 없는 사용자면 None
+        """
+        with self._user_cache_lock:
+            user_id = self._user_cache.get(user_name)
+            if user_id is not None:
+                self._user_cache.move_to_end(user_name)
+                return user_id
+        
+        if create:
+            cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (user_name,))
+        cursor.execute("SELECT id FROM users WHERE name = ?", (user_name,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        
+        with self._user_cache_lock:
+            self._user_cache[user_name] = row['id']
+            if len(self._user_cache) > USER_CACHE_SIZE:
+                self._user_cache.popitem(last=False)
+        return row['id']
     
-    def init_machines(self, num_machines: int):
+    def init_machines(self, num_machines: int, fleet: Optional[List[tuple]] = None):
         """
         세탁기 초기화 (시스템 시작 시 호출)
         
+        없는 번호의 기기는 새로 만들고, 기기 구성이 주어지면 기존 기기의 종류/용량도 맞춥니다.
+        
         Args:
             num_machines: 세탁기 개수
+            fleet: 기기별 (종류, 용량 kg) 리스트 (없으면 기본 용량 세탁기 num_machines대)
         """
+        fleet_spec = ",".join(f"{machine_type}:{capacity_kg}" for machine_type, capacity_kg in fleet or [])
         with self.get_cursor() as cursor:
+            # 설정이 지난번과 같으면 쓰기 없이 종료 (재시작마다 쓰기 트랜잭션을 만들지 않음)
+            cursor.execute("SELECT key, value FROM system_config WHERE key IN ('num_machines', 'fleet')")
+            config = {row['key']: row['value'] for row in cursor.fetchall()}
+            if config.get('num_machines') == str(num_machines) and config.get('fleet', '') == fleet_spec:
+                return
+            
             # 기존 세탁기 확인
-            cursor.execute("SELECT COUNT(*) as count FROM machines")
+            cursor.execute("SELECT COALESCE(MAX(machine_id), 0) AS count FROM machines")
             existing_count = cursor.fetchone()['count']
             
-            if existing_count == 0:
-                # 세탁기 생성
-                for i in range(1, num_machines + 1):
-                    cursor.execute("""
-                        INSERT INTO machines (machine_id, status, user_name, start_time, end_time, duration_minutes)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (i, "사용 가능", None, None, None, 0))
+            # 세탁기 생성
+            cursor.executemany("""
+                INSERT INTO machines (machine_id, status, user_id, start_time, end_time, duration_minutes)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(i, "사용 가능", None, None, None, 0) for i in range(existing_count + 1, num_machines + 1)])
             
-            # 세탁기 개수 저장
-            cursor.execute("""
+            if fleet:
+                cursor.executemany("""
+                    UPDATE machines SET machine_type = ?, capacity_kg = ?
+                    WHERE machine_id = ?
+                """, [(machine_type, capacity_kg, i) for i, (machine_type, capacity_kg) in enumerate(fleet, 1)])
+            
+            # 세탁기 개수와 구성 저장
+            cursor.executemany("""
                 INSERT OR REPLACE INTO system_config (key, value)
-                VALUES ('num_machines', ?)
-            """, (str(num_machines),))
+                VALUES (?, ?)
+            """, [('num_machines', str(num_machines)), ('fleet', fleet_spec)])
     
     def get_machines(self) -> List[Dict]:
         """
@@ -142,13 +454,127 @@ class Database:
             세탁기 정보 리스트
         """
         with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM machines ORDER BY machine_id")
+            cursor.execute(MACHINE_SELECT + " ORDER BY m.machine_id")
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    def get_machine(self, machine_id: int) -> Optional[Dict]:
+        """
+        세탁기 한 대의 정보 조회 (기본 키 조회)
+        
+        Args:
+            machine_id: 세탁기 번호
+        
+        Returns:
+            세탁기 정보. 없으면 None
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute(MACHINE_SELECT + " WHERE m.machine_id = ?", (machine_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_busy_machine_summary(self, machine_type: str, min_capacity: int) -> Dict:
+        """
+        용량이 충분한 같은 종류 기기 중 사용 중(또는 옷을 가져가지 않은) 기기 요약 조회
+        
+        종류/용량 인덱스만 읽으므로 전체 세탁기 목록을 가져오지 않습니다.
+        
+        Args:
+            machine_type: 기기 종류
+            min_capacity: 최소 용량 (kg)
+        
+        Returns:
+            count(기기 수)와 earliest_end_time(가장 빠른 종료 시간, 없으면 None)이 담긴 딕셔너리
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(end_time) AS count, MIN(end_time) AS earliest_end_time FROM machines
+                WHERE machine_type = ? AND capacity_kg >= ?
+            """, (machine_type, min_capacity))
+            return dict(cursor.fetchone())
+    
+    def has_due_updates(self, current_time: datetime) -> bool:
+        """
+        완료 처리할 세탁기나 만료된 예약이 있는지 확인 (읽기 전용)
+        
+        인덱스만 확인하므로, 할 일이 없을 때 쓰기 잠금을 잡지 않고 끝낼 수 있습니다.
+        
+        Args:
+            current_time: 기준 시간
+        
+        Returns:
+            종료 시간이 지난 사용 중 세탁기 또는 만료 시간이 지난 예약이 있으면 True
+        """
+        now = current_time.isoformat()
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT EXISTS (SELECT 1 FROM machines WHERE status = '사용 중' AND end_time <= ?)
+                    OR EXISTS (SELECT 1 FROM reservations WHERE expiry_time < ?) AS due
+            """, (now, now))
+            return bool(cursor.fetchone()['due'])
+    
+    def complete_finished_machines(self, current_time: datetime, messages: Dict[str, str]) -> List[Dict]:
+        """
+        종료 시간이 지난 세탁 중인 세탁기를 한 번에 완료 처리하고 알림 추가
+        
+        UPDATE 한 번과 알림 INSERT 한 번(executemany)을 하나의 트랜잭션으로 실행합니다.
+        
+        Args:
+            current_time: 기준 시간
+            messages: 기기 종류별 알림 메시지 형식 ({machine_id} 자리에 기기 번호가 들어감)
+        
+        Returns:
+            완료 처리된 세탁기 리스트 (machine_id, machine_type, user_name)
+        """
+        now = current_time.isoformat()
+        with self.get_cursor() as cursor:
+            if SUPPORTS_RETURNING:
+                cursor.execute("""
+                    UPDATE machines SET status = '완료'
+                    WHERE status = '사용 중' AND end_time <= ?
+                    RETURNING machine_id, user_id, machine_type
+                """, (now,))
+                finished = [dict(row) for row in cursor.fetchall()]
+            else:
+                # 조회와 갱신 사이에 다른 프로세스가 끼어들지 않도록 쓰기 잠금을 먼저 잡음
+                if not cursor.connection.in_transaction:
+                    cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("""
+                    SELECT machine_id, user_id, machine_type FROM machines
+                    WHERE status = '사용 중' AND end_time <= ?
+                """, (now,))
+                finished = [dict(row) for row in cursor.fetchall()]
+                cursor.execute("""
+                    UPDATE machines SET status = '완료'
+                    WHERE status = '사용 중' AND end_time <= ?
+                """, (now,))
+            
+            if not finished:
+                return []
+            
+            cursor.executemany("""
+                INSERT INTO notifications (user_id, message, timestamp, read)
+                VALUES (?, ?, ?, 0)
+            """, [
+                (m['user_id'], messages[m['machine_type']].format(machine_id=m['machine_id']), now)
+                for m in finished
+            ])
+            
+            # 반환값은 기존과 같이 사용자 이름으로
+            user_ids = sorted({m['user_id'] for m in finished})
+            cursor.execute(
+                f"SELECT id, name FROM users WHERE id IN ({', '.join('?' * len(user_ids))})",
+                user_ids
+            )
+            names = {row['id']: row['name'] for row in cursor.fetchall()}
+            return [
+                {"machine_id": m['machine_id'], "machine_type": m['machine_type'], "user_name": names.get(m['user_id'])}
+                for m in finished
+            ]
+    
     def update_machine(self, machine_id: int, status: str, user_name: Optional[str] = None,
                       start_time: Optional[datetime] = None, end_time: Optional[datetime] = None,
-                      duration_minutes: int = 0):
+                      duration_minutes: int = 0, load_kg: int = 0, then_dry: bool = False):
         """
         세탁기 상태 업데이트
         
@@ -159,26 +585,94 @@ class Database:
             start_time: 시작 시간
             end_time: 종료 시간
             duration_minutes: 소요 시간
+            load_kg: 세탁물 무게 (kg)
+            then_dry: 세탁 후 건조기 연결 여부
         """
         with self.get_cursor() as cursor:
+            user_id = self._get_user_id(cursor, user_name) if user_name else None
             cursor.execute("""
                 UPDATE machines
-                SET status = ?, user_name = ?, start_time = ?, end_time = ?, duration_minutes = ?
+                SET status = ?, user_id = ?, start_time = ?, end_time = ?, duration_minutes = ?,
+                    load_kg = ?, then_dry = ?
                 WHERE machine_id = ?
             """, (
                 status,
-                user_name,
+                user_id,
                 start_time.isoformat() if start_time else None,
                 end_time.isoformat() if end_time else None,
                 duration_minutes,
+                load_kg,
+                int(then_dry),
                 machine_id
             ))
     
+    def claim_machine(self, machine_id: int, user_name: str, start_time: datetime, end_time: datetime,
+                      duration_minutes: int, load_kg: int = 0, then_dry: bool = False,
+                      previous_user: Optional[str] = None) -> bool:
+        """
+        기기를 사용자에게 배정하고 사용 횟수 증가
+        
+        기기가 예상한 상태일 때만 바꾸므로 다른 프로세스가 먼저 배정한 기기를 덮어쓰지 않습니다.
+        
+        Args:
+            machine_id: 기기 번호
+            user_name: 사용자 이름
+            start_time: 시작 시간
+            end_time: 종료 시간
+            duration_minutes: 소요 시간
+            load_kg: 세탁물 무게 (kg)
+            then_dry: 세탁 후 건조기 연결 여부
+            previous_user: 이 사용자가 쓰던 기기를 넘겨받는 경우 (없으면 사용 가능 상태여야 함)
+        
+        Returns:
+            배정 여부
+        """
+        with self.get_cursor() as cursor:
+            if previous_user is None:
+                condition, param = "status = ?", "사용 가능"
+            else:
+                condition, param = "user_id = ?", self._get_user_id(cursor, previous_user, create=False)
+            cursor.execute(f"""
+                UPDATE machines
+                SET status = '사용 중', user_id = ?, start_time = ?, end_time = ?, duration_minutes = ?,
+                    load_kg = ?, then_dry = ?, usage_count = usage_count + 1
+                WHERE machine_id = ? AND {condition}
+            """, (
+                self._get_user_id(cursor, user_name),
+                start_time.isoformat(),
+                end_time.isoformat(),
+                duration_minutes,
+                load_kg,
+                int(then_dry),
+                machine_id,
+                param
+            ))
+            return cursor.rowcount > 0
+    
+    def update_machine_end_time(self, machine_id: int, end_time: datetime) -> bool:
+        """
+        세탁 중인 세탁기의 종료 시간만 변경
+        
+        Args:
+            machine_id: 세탁기 번호
+            end_time: 새 종료 시간
+        
+        Returns:
+            변경 여부 (세탁 중이 아니면 False)
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                UPDATE machines SET end_time = ?
+                WHERE machine_id = ? AND status = '사용 중'
+            """, (end_time.isoformat(), machine_id))
+            return cursor.rowcount > 0
+    
     def reset_machine(self, machine_id: int):
         """세탁기 리셋"""
         self.update_machine(machine_id, "사용 가능", None, None, None, 0)
     
-    def add_reservation(self, user_name: str, reservation_time: datetime, expiry_time: datetime) -> int:
+    def add_reservation(self, user_name: str, reservation_time: datetime, expiry_time: datetime,
+                        machine_type: str = "세탁기", load_kg: int = 0, then_dry: bool = False) -> int:
         """
         예약 추가
         
@@ -187,42 +681,90 @@ class Database:
         """
         with self.get_cursor() as cursor:
             cursor.execute("""
-                INSERT INTO reservations (user_name, reservation_time, expiry_time)
-                VALUES (?, ?, ?)
+                INSERT INTO reservations (user_id, reservation_time, expiry_time, machine_type, load_kg, then_dry)
+                VALUES (?, ?, ?, ?, ?, ?)
             """, (
-                user_name,
+                self._get_user_id(cursor, user_name),
                 reservation_time.isoformat(),
-                expiry_time.isoformat()
+                expiry_time.isoformat(),
+                machine_type,
+                load_kg,
+                int(then_dry)
             ))
             return cursor.lastrowid
     
     def get_reservations(self) -> List[Dict]:
         """모든 예약 조회"""
         with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM reservations ORDER BY reservation_time")
+            cursor.execute(RESERVATION_SELECT + " ORDER BY r.reservation_time")
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
-    def delete_reservation(self, reservation_id: int):
-        """예약 삭제"""
+    def delete_reservation(self, reservation_id: int) -> bool:
+        """
+        예약 삭제
+        
+        Returns:
+            삭제 여부 (이미 없는 예약이면 False)
+        """
         with self.get_cursor() as cursor:
             cursor.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+            return cursor.rowcount > 0
     
-    def delete_reservations_by_user(self, user_name: str):
-        """사용자의 모든 예약 삭제"""
+    def count_reservations(self, machine_type: Optional[str] = None) -> int:
+        """
+        대기 중인 예약 개수 조회
+        
+        Args:
+            machine_type: 이 종류 기기를 기다리는 예약만 (없으면 전체)
+        """
         with self.get_cursor() as cursor:
-            cursor.execute("DELETE FROM reservations WHERE user_name = ?", (user_name,))
+            if machine_type is None:
+                cursor.execute("SELECT COUNT(*) AS count FROM reservations")
+            else:
+                cursor.execute("SELECT COUNT(*) AS count FROM reservations WHERE machine_type = ?", (machine_type,))
+            return cursor.fetchone()['count']
     
-    def delete_expired_reservations(self):
-        """만료된 예약 삭제"""
+    def delete_reservations_by_user(self, user_name: str) -> int:
+        """
+        사용자의 모든 예약 삭제
+        
+        Returns:
+            삭제된 예약 개수
+        """
+        with self.get_cursor() as cursor:
+            user_id = self._get_user_id(cursor, user_name, create=False)
+            if user_id is None:
+                return 0
+            cursor.execute("DELETE FROM reservations WHERE user_id = ?", (user_id,))
+            return cursor.rowcount
+    
+    def delete_expired_reservations(self) -> List[int]:
+        """
+        만료된 예약 삭제
+        
+        Returns:
+            삭제된 예약 ID 리스트
+        """
         with self.get_cursor() as cursor:
             current_time = datetime.now().isoformat()
-            cursor.execute("DELETE FROM reservations WHERE expiry_time < ?", (current_time,))
+            if SUPPORTS_RETURNING:
+                cursor.execute("DELETE FROM reservations WHERE expiry_time < ? RETURNING id", (current_time,))
+                return [row['id'] for row in cursor.fetchall()]
+            
+            # 조회와 삭제 사이에 다른 프로세스가 끼어들지 않도록 쓰기 잠금을 먼저 잡음
+            if not cursor.connection.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT id FROM reservations WHERE expiry_time < ?", (current_time,))
+            expired_ids = [row['id'] for row in cursor.fetchall()]
+            if expired_ids:
+                cursor.execute("DELETE FROM reservations WHERE expiry_time < ?", (current_time,))
+            return expired_ids
     
     def get_first_reservation(self) -> Optional[Dict]:
         """가장 오래된 예약 조회"""
         with self.get_cursor() as cursor:
-            cursor.execute("SELECT * FROM reservations ORDER BY reservation_time LIMIT 1")
+            cursor.execute(RESERVATION_SELECT + " ORDER BY r.reservation_time LIMIT 1")
             row = cursor.fetchone()
             return dict(row) if row else None
     
@@ -230,25 +772,354 @@ class Database:
         """알림 추가"""
         with self.get_cursor() as cursor:
             cursor.execute("""
-                INSERT INTO notifications (user_name, message, timestamp, read)
+                INSERT INTO notifications (user_id, message, timestamp, read)
                 VALUES (?, ?, ?, 0)
-            """, (user_name, message, timestamp.isoformat()))
+            """, (self._get_user_id(cursor, user_name), message, timestamp.isoformat()))
     
     def get_notifications(self, user_name: str) -> List[Dict]:
         """사용자의 알림 조회"""
         with self.get_cursor() as cursor:
-            cursor.execute("""
-                SELECT * FROM notifications
-                WHERE user_name = ? AND read = 0
-                ORDER BY timestamp DESC
-            """, (user_name,))
+            user_id = self._get_user_id(cursor, user_name, create=False)
+            if user_id is None:
+                return []
+            cursor.execute(NOTIFICATION_SELECT + """
+                WHERE n.user_id = ? AND n.read = 0
+                ORDER BY n.timestamp DESC
+            """, (user_id,))
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
     def clear_notifications(self, user_name: str):
         """사용자의 알림 삭제 (읽음 처리)"""
         with self.get_cursor() as cursor:
-            cursor.execute("UPDATE notifications SET read = 1 WHERE user_name = ?", (user_name,))
+            user_id = self._get_user_id(cursor, user_name, create=False)
+            if user_id is not None:
+                cursor.execute("UPDATE notifications SET read = 1 WHERE user_id = ?", (user_id,))
+    
+    def get_dashboard_data(self, user_name: Optional[str] = None) -> Dict:
+        """
+        대시보드용 데이터를 하나의 읽기 트랜잭션으로 조회
+        
+        세탁기, 예약, 알림을 같은 시점의 일관된 상태로 읽습니다.
+        
+        Args:
+            user_name: 알림을 조회할 사용자 이름 (없으면 알림 생략)
+        
+        Returns:
+            machines, reservations, notifications 리스트가 담긴 딕셔너리
+        """
+        with self.get_cursor() as cursor:
+            if not cursor.connection.in_transaction:
+                cursor.execute("BEGIN")
+            cursor.execute(MACHINE_SELECT + " ORDER BY m.machine_id")
+            machines = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(RESERVATION_SELECT + " ORDER BY r.reservation_time")
+            reservations = [dict(row) for row in cursor.fetchall()]
+            notifications = []
+            user_id = self._get_user_id(cursor, user_name, create=False) if user_name else None
+            if user_id is not None:
+                cursor.execute(NOTIFICATION_SELECT + """
+                    WHERE n.user_id = ? AND n.read = 0
+                    ORDER BY n.timestamp DESC
+                """, (user_id,))
+                notifications = [dict(row) for row in cursor.fetchall()]
+            return {
+                "machines": machines,
+                "reservations": reservations,
+                "notifications": notifications
+            }
+    
+    def add_telemetry_buckets(self, buckets: List[tuple]):
+        """
+        다운샘플링된 텔레메트리를 한 번에 저장
+        
+        같은 (세탁기, 구간)이 이미 있으면 표본 수로 가중 평균하여 합칩니다.
+        
+        Args:
+            buckets: (machine_id, bucket_start, samples, avg_progress, min_remaining_seconds) 튜플 리스트
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO telemetry (machine_id, bucket_start, samples, avg_progress, min_remaining_seconds)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (machine_id, bucket_start) DO UPDATE SET
+                    avg_progress = CASE
+                        WHEN excluded.avg_progress IS NULL THEN telemetry.avg_progress
+                        WHEN telemetry.avg_progress IS NULL THEN excluded.avg_progress
+                        ELSE (telemetry.avg_progress * telemetry.samples + excluded.avg_progress * excluded.samples)
+                             / (telemetry.samples + excluded.samples)
+                    END,
+                    min_remaining_seconds = MIN(
+                        COALESCE(telemetry.min_remaining_seconds, excluded.min_remaining_seconds),
+                        COALESCE(excluded.min_remaining_seconds, telemetry.min_remaining_seconds)
+                    ),
+                    samples = telemetry.samples + excluded.samples
+            """, buckets)
+    
+    def iter_export(self, source: str, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None, chunk_size: int = 1000) -> Iterator[Dict]:
+        """
+        내보내기용 행을 일정 크기 묶음으로 나누어 차례로 반환 (제너레이터)
+        
+        전체 결과를 메모리에 올리지 않도록 키셋 페이지 방식으로 chunk_size개씩 조회하며,
+        묶음마다 짧은 읽기 트랜잭션만 사용하므로 오래 걸리는 내보내기 중에도
+        쓰기 작업이 막히지 않습니다. 응답 스트리밍 중에 사용되므로 별도 연결을 엽니다.
+        
+        Args:
+            source: 내보내기 대상 (sessions, reservations, notifications)
+            since: 이 시간 이후(포함)의 행만
+            until: 이 시간 이전(포함)의 행만
+            chunk_size: 한 번에 조회할 행 수
+        
+        Yields:
+            행 딕셔너리
+        """
+        key, time_column, select_sql, _ = EXPORT_SOURCES[source]
+        
+        conditions = ""
+        params: list = []
+        if since is not None:
+            conditions += f" AND {time_column} >= ?"
+            params.append(since.isoformat())
+        if until is not None:
+            conditions += f" AND {time_column} <= ?"
+            params.append(until.isoformat())
+        query = f"{select_sql}{conditions} AND {key} > ? ORDER BY {key} LIMIT ?"
+        key_name = key.split('.')[1]
+        
+        conn = sqlite3.connect(self.db_path, timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        try:
+            last_key = 0
+            while True:
+                rows = conn.execute(query, params + [last_key, chunk_size]).fetchall()
+                for row in rows:
+                    yield dict(row)
+                if len(rows) < chunk_size:
+                    break
+                last_key = rows[-1][key_name]
+        finally:
+            conn.close()
+    
+    def append_events(self, events: List[tuple]) -> int:
+        """
+        이벤트 여러 개를 한 번에 추가
+        
+        Args:
+            events: (event_type, payload, timestamp) 튜플 리스트
+        
+        Returns:
+            마지막 이벤트 일련번호 (seq)
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO events (event_type, payload, timestamp)
+                VALUES (?, ?, ?)
+            """, [(event_type, payload, timestamp.isoformat()) for event_type, payload, timestamp in events])
+            cursor.execute("SELECT MAX(seq) AS seq FROM events")
+            return cursor.fetchone()['seq']
+    
+    def get_last_seq(self) -> int:
+        """
+        저널의 마지막 이벤트 일련번호 조회
+        
+        Returns:
+            마지막 일련번호 (이벤트가 없으면 0)
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT MAX(seq) AS seq FROM events")
+            return cursor.fetchone()['seq'] or 0
+    
+    def get_events(self, after_seq: int = 0, until: Optional[datetime] = None,
+                   limit: Optional[int] = None) -> List[Dict]:
+        """
+        일련번호 순서로 이벤트 조회
+        
+        Args:
+            after_seq: 이 일련번호 이후의 이벤트만 조회
+            until: 이 시간 이전(포함)의 이벤트만 조회
+            limit: 최대 조회 개수
+        
+        Returns:
+            이벤트 리스트
+        """
+        query = "SELECT * FROM events WHERE seq > ?"
+        params: list = [after_seq]
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(until.isoformat())
+        query += " ORDER BY seq"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            return [dict(row) for row in rows]
+    
+    def save_snapshot(self, seq: int, state: str, timestamp: datetime):
+        """
+        상태 스냅샷 저장
+        
+        Args:
+            seq: 스냅샷에 반영된 마지막 이벤트 일련번호
+            state: JSON 직렬화된 상태
+            timestamp: 스냅샷 시간
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO snapshots (seq, state, timestamp)
+                VALUES (?, ?, ?)
+            """, (seq, state, timestamp.isoformat()))
+    
+    def get_latest_snapshot(self, until: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        가장 최근 스냅샷 조회
+        
+        Args:
+            until: 이 시간 이전(포함)에 저장된 스냅샷만 대상으로 함
+        
+        Returns:
+            스냅샷 정보. 없으면 None
+        """
+        with self.get_cursor() as cursor:
+            if until is None:
+                cursor.execute("SELECT * FROM snapshots ORDER BY seq DESC LIMIT 1")
+            else:
+                cursor.execute("""
+                    SELECT * FROM snapshots
+                    WHERE timestamp <= ?
+                    ORDER BY seq DESC LIMIT 1
+                """, (until.isoformat(),))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_idempotency_key(self, key: str) -> Optional[Dict]:
+        """
+        멱등성 키로 저장된 응답 조회
+        
+        Args:
+            key: 멱등성 키
+        
+        Returns:
+            저장된 응답 정보 (fingerprint, status, response, created_at). 없으면 None
+            (status가 0이면 아직 처리 중)
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("SELECT * FROM idempotency_keys WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def claim_idempotency_key(self, key: str, fingerprint: str, created_at: datetime,
+                              stale_before: datetime) -> bool:
+        """
+        멱등성 키를 처리 중(status 0)으로 선점
+        
+        같은 키를 다른 프로세스가 처리 중이면 실패합니다.
+        처리 중 표시가 stale_before보다 오래되었으면 (처리하던 프로세스가 멈춘 경우) 넘겨받습니다.
+        
+        Args:
+            key: 멱등성 키
+            fingerprint: 요청 지문
+            created_at: 선점 시간
+            stale_before: 이 시간 이전의 처리 중 표시는 버려진 것으로 봄
+        
+        Returns:
+            선점 여부
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO idempotency_keys (key, fingerprint, status, response, created_at)
+                VALUES (?, ?, 0, '', ?)
+                ON CONFLICT (key) DO UPDATE SET fingerprint = excluded.fingerprint, created_at = excluded.created_at
+                WHERE status = 0 AND created_at < ?
+            """, (key, fingerprint, created_at.isoformat(), stale_before.isoformat()))
+            return cursor.rowcount == 1
+    
+    def release_idempotency_key(self, key: str):
+        """
+        응답을 저장하지 않고 끝난 요청의 처리 중 표시 삭제
+        
+        Args:
+            key: 멱등성 키
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("DELETE FROM idempotency_keys WHERE key = ? AND status = 0", (key,))
+    
+    def save_idempotency_key(self, key: str, fingerprint: str, status: int, response: str,
+                             created_at: datetime):
+        """
+        멱등성 키와 응답 저장
+        
+        Args:
+            key: 멱등성 키
+            fingerprint: 요청 지문
+            status: 응답 상태 코드
+            response: 응답 본문
+            created_at: 저장 시간
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status, response, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, fingerprint, status, response, created_at.isoformat()))
+    
+    def delete_idempotency_keys(self, before: datetime) -> int:
+        """
+        오래된 멱등성 키 삭제
+        
+        Args:
+            before: 이 시간 이전에 저장된 키를 삭제
+        
+        Returns:
+            삭제된 키 개수
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("DELETE FROM idempotency_keys WHERE created_at < ?", (before.isoformat(),))
+            return cursor.rowcount
+    
+    def add_dead_letters(self, channel: str, notifications: List[Dict], attempts: int, error: str,
+                         failed_at: datetime):
+        """
+        보내지 못한 알림을 데드레터로 저장
+        
+        Args:
+            channel: 알림 채널 이름
+            notifications: 알림 리스트 (user_name, message, timestamp)
+            attempts: 시도한 횟수
+            error: 마지막 오류 메시지
+            failed_at: 포기한 시간
+        """
+        with self.get_cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO dead_letters (channel, user_id, message, timestamp, attempts, error, failed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (channel, self._get_user_id(cursor, n['user_name']), n['message'], n['timestamp'],
+                 attempts, error, failed_at.isoformat())
+                for n in notifications
+            ])
+    
+    def get_dead_letters(self, limit: int = 100) -> List[Dict]:
+        """
+        최근 데드레터 조회
+        
+        Args:
+            limit: 최대 조회 개수
+        
+        Returns:
+            데드레터 리스트 (최신 순)
+        """
+        with self.get_cursor() as cursor:
+            cursor.execute("""
+                SELECT d.id, d.channel, u.name AS user_name, d.message, d.timestamp,
+                       d.attempts, d.error, d.failed_at
+                FROM dead_letters d JOIN users u ON u.id = d.user_id
+                ORDER BY d.id DESC
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor.fetchall()]
     
     def close(self):
         """데이터베이스 연결 종료"""
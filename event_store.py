@@ -0,0 +1,309 @@
+"""
+이벤트 저널 모듈
+
+세탁기/예약 상태 변경을 추가 전용(append-only) 이벤트 로그로 기록합니다.
+주기적으로 상태 스냅샷을 저장하여 시작 시 최근 스냅샷 + 이후 이벤트만 재생해
+메모리 상태를 빠르게 복원하고, 과거 임의 시점의 상태도 재구성할 수 있습니다.
+
+저널은 감사 기록과 과거 상태 조회(get_state_at)용입니다.
+조회의 기준(읽기 모델)은 여전히 machines/reservations 테이블이며,
+상태 변경은 테이블을 갱신하고 같은 트랜잭션에서 이벤트를 추가하므로 쓰기 작업이 그만큼 늘어납니다.
+재생된 메모리 상태(EventStore.state)는 테이블과 저널이 일치하는지 검사하는 데(stress_test.py) 사용합니다.
+"""
+
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models import DEFAULT_CAPACITY_KG, EventType, MachineStatus, MachineType
+from database import Database
+
+
+class SystemState:
+    """
+    이벤트 재생으로 만들어지는 메모리 내 시스템 상태
+    
+    세탁기와 예약은 데이터베이스 행과 같은 형태의 딕셔너리로 보관합니다.
+    """
+    
+    def __init__(self):
+        """빈 상태로 초기화"""
+        self.machines: Dict[int, dict] = {}
+        self.reservations: List[dict] = []  # 예약 시간 순서 (FIFO)
+    
+    def apply(self, event_type: EventType, payload: dict):
+        """
+        이벤트 하나를 상태에 반영
+        
+        Args:
+            event_type: 이벤트 종류
+            payload: 이벤트 데이터
+        """
+        if event_type == EventType.WASH_STARTED:
+            previous = self.machines.get(payload['machine_id'], {})
+            self.machines[payload['machine_id']] = {
+                "machine_id": payload['machine_id'],
+                "status": MachineStatus.IN_USE.value,
+                "user_name": payload['user_name'],
+                "start_time": payload['start_time'],
+                "end_time": payload['end_time'],
+                "duration_minutes": payload['duration_minutes'],
+                "machine_type": payload.get('machine_type', previous.get('machine_type', MachineType.WASHER.value)),
+                "capacity_kg": payload.get('capacity_kg', previous.get('capacity_kg', DEFAULT_CAPACITY_KG)),
+                "usage_count": previous.get('usage_count', 0) + 1,
+                "load_kg": payload.get('load_kg', 0),
+                "then_dry": int(payload.get('then_dry', False))
+            }
+            # 예약자에게 자동 할당된 경우 대기열에서 제거
+            reservation_id = payload.get('reservation_id')
+            if reservation_id is not None:
+                self.reservations = [r for r in self.reservations if r['id'] != reservation_id]
+        
+        elif event_type == EventType.WASH_COMPLETED:
+            machine = self.machines.get(payload['machine_id'])
+            if machine:
+                machine['status'] = MachineStatus.COMPLETED.value
+        
+        elif event_type == EventType.END_TIME_ADJUSTED:
+            machine = self.machines.get(payload['machine_id'])
+            if machine:
+                machine['end_time'] = payload['end_time']
+        
+        elif event_type == EventType.COLLECTED:
+            self.machines[payload['machine_id']] = self._empty_machine(
+                payload['machine_id'], self.machines.get(payload['machine_id'], {})
+            )
+        
+        elif event_type == EventType.RESERVED:
+            self.reservations.append({
+                "id": payload['reservation_id'],
+                "user_name": payload['user_name'],
+                "reservation_time": payload['reservation_time'],
+                "expiry_time": payload['expiry_time'],
+                "machine_type": payload.get('machine_type', MachineType.WASHER.value),
+                "load_kg": payload.get('load_kg', 0),
+                "then_dry": int(payload.get('then_dry', False))
+            })
+        
+        elif event_type == EventType.RESERVATION_EXPIRED:
+            expired_ids = set(payload['reservation_ids'])
+            self.reservations = [r for r in self.reservations if r['id'] not in expired_ids]
+        
+        elif event_type == EventType.RESERVATION_CANCELLED:
+            self.reservations = [r for r in self.reservations if r['user_name'] != payload['user_name']]
+        
+        # NOTIFICATION_SENT는 감사 기록용이며 세탁기/대기열 상태를 바꾸지 않습니다
+    
+    @staticmethod
+    def _empty_machine(machine_id: int, previous: dict) -> dict:
+        """사용 가능 상태의 세탁기 딕셔너리 생성 (종류/용량/사용 횟수는 이전 값 유지)"""
+        return {
+            "machine_id": machine_id,
+            "status": MachineStatus.AVAILABLE.value,
+            "user_name": None,
+            "start_time": None,
+            "end_time": None,
+            "duration_minutes": 0,
+            "machine_type": previous.get('machine_type', MachineType.WASHER.value),
+            "capacity_kg": previous.get('capacity_kg', DEFAULT_CAPACITY_KG),
+            "usage_count": previous.get('usage_count', 0),
+            "load_kg": 0,
+            "then_dry": 0
+        }
+    
+    def to_dict(self) -> dict:
+        """
+        상태를 딕셔너리로 변환 (스냅샷 저장용)
+        
+        Returns:
+            세탁기 목록과 예약 목록이 담긴 딕셔너리
+        """
+        return {
+            "machines": [dict(self.machines[mid]) for mid in sorted(self.machines)],
+            "reservations": [dict(r) for r in self.reservations]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SystemState':
+        """
+        딕셔너리에서 상태 복원
+        
+        Args:
+            data: to_dict()로 만든 딕셔너리 (또는 같은 형태의 DB 조회 결과)
+        
+        Returns:
+            SystemState 객체
+        """
+        state = cls()
+        for machine in data.get('machines', []):
+            state.machines[machine['machine_id']] = dict(machine)
+        state.reservations = [dict(r) for r in data.get('reservations', [])]
+        return state
+
+
+class EventStore:
+    """
+    이벤트 저널 관리 클래스
+    
+    이벤트를 순서대로 추가하고 메모리 상태에 즉시 반영합니다.
+    snapshot_interval 개의 이벤트마다 스냅샷을 저장합니다.
+    여러 프로세스가 같은 저널에 쓰는 경우 다른 프로세스의 이벤트까지 재생한 뒤 스냅샷을 저장합니다.
+    """
+    
+    def __init__(self, db: Database, snapshot_interval: int = 500):
+        """
+        이벤트 저널 초기화
+        
+        Args:
+            db: 데이터베이스 객체
+            snapshot_interval: 스냅샷 저장 주기 (이벤트 개수)
+        """
+        self.db = db
+        self.snapshot_interval = snapshot_interval
+        self.state = SystemState()
+        self.last_seq = 0
+        self._events_since_snapshot = 0
+        self._lock = threading.Lock()
+    
+    def load(self):
+        """
+        최근 스냅샷과 이후 이벤트를 재생하여 메모리 상태 복원
+        
+        저널이 비어 있으면 (기존 데이터베이스) 현재 테이블 내용으로
+        첫 스냅샷을 만들어 이후 재생의 기준점으로 삼습니다.
+        """
+        with self._lock:
+            snapshot = self.db.get_latest_snapshot()
+            if snapshot is None and not self.db.get_events(limit=1):
+                self.state = SystemState.from_dict({
+                    "machines": self.db.get_machines(),
+                    "reservations": self.db.get_reservations()
+                })
+                self.last_seq = 0
+                self.db.save_snapshot(0, json.dumps(self.state.to_dict()), datetime.now())
+                self._events_since_snapshot = 0
+                return
+            
+            self.state, self.last_seq = self._replay(snapshot)
+            self._events_since_snapshot = 0
+    
+    def _replay(self, snapshot: Optional[dict], until: Optional[datetime] = None):
+        """
+        스냅샷에서 시작해 이벤트를 재생
+        
+        Args:
+            snapshot: 시작 스냅샷 (None이면 빈 상태에서 시작)
+            until: 이 시간까지의 이벤트만 재생
+        
+        Returns:
+            (재생된 상태, 마지막으로 반영된 이벤트 일련번호)
+        """
+        if snapshot:
+            state = SystemState.from_dict(json.loads(snapshot['state']))
+            last_seq = snapshot['seq']
+        else:
+            state = SystemState()
+            last_seq = 0
+        
+        for event in self.db.get_events(after_seq=last_seq, until=until):
+            state.apply(EventType(event['event_type']), json.loads(event['payload']))
+            last_seq = event['seq']
+        return state, last_seq
+    
+    def record(self, event_type: EventType, **payload) -> int:
+        """
+        이벤트를 저널에 추가하고 메모리 상태에 반영
+        
+        Args:
+            event_type: 이벤트 종류
+            **payload: 이벤트 데이터 (JSON 직렬화 가능해야 함)
+        
+        Returns:
+            이벤트 일련번호 (seq)
+        """
+        return self.record_many([(event_type, payload)])
+    
+    def record_many(self, events: List[tuple]) -> int:
+        """
+        이벤트 여러 개를 한 번의 INSERT로 저널에 추가하고 메모리 상태에 반영
+        
+        Database.transaction() 안에서 호출하면 테이블 변경과 같은 트랜잭션으로 커밋됩니다.
+        
+        Args:
+            events: (event_type, payload 딕셔너리) 튜플 리스트
+        
+        Returns:
+            마지막 이벤트 일련번호 (seq)
+        """
+        if not events:
+            return self.last_seq
+        with self._lock, self.db.transaction():
+            timestamp = datetime.now()
+            seq = self.db.append_events([
+                (event_type.value, json.dumps(payload, ensure_ascii=False), timestamp)
+                for event_type, payload in events
+            ])
+            if seq - len(events) == self.last_seq:
+                for event_type, payload in events:
+                    self.state.apply(event_type, payload)
+                self.last_seq = seq
+            else:
+                # 다른 프로세스가 그 사이에 쓴 이벤트가 있음: 데이터베이스 순서대로 재생해야
+                # 스냅샷이 전역 일련번호(seq)와 맞습니다
+                self._apply_from_db()
+            
+            self._events_since_snapshot += len(events)
+            if self._events_since_snapshot >= self.snapshot_interval:
+                self.db.save_snapshot(self.last_seq, json.dumps(self.state.to_dict()), timestamp)
+                self._events_since_snapshot = 0
+            return seq
+    
+    def catch_up(self) -> bool:
+        """
+        다른 프로세스가 추가한 이벤트를 메모리 상태에 반영
+        
+        Returns:
+            반영한 이벤트가 있었는지 여부
+        """
+        with self._lock:
+            if self.db.get_last_seq() == self.last_seq:
+                return False
+            self._apply_from_db()
+            return True
+    
+    def _apply_from_db(self):
+        """last_seq 이후의 이벤트를 데이터베이스에서 읽어 순서대로 반영 (잠금을 잡은 상태에서 호출)"""
+        for event in self.db.get_events(after_seq=self.last_seq):
+            self.state.apply(EventType(event['event_type']), json.loads(event['payload']))
+            self.last_seq = event['seq']
+    
+    def state_at(self, when: datetime) -> SystemState:
+        """
+        과거 특정 시점의 상태 재구성
+        
+        Args:
+            when: 재구성할 시점
+        
+        Returns:
+            해당 시점의 SystemState
+        """
+        snapshot = self.db.get_latest_snapshot(until=when)
+        state, _ = self._replay(snapshot, until=when)
+        return state
+    
+    def get_events(self, after_seq: int = 0, limit: int = 100) -> List[dict]:
+        """
+        저널 이벤트 조회 (감사 기록용)
+        
+        Args:
+            after_seq: 이 일련번호 이후의 이벤트만 조회
+            limit: 최대 조회 개수
+        
+        Returns:
+            이벤트 리스트 (payload는 딕셔너리로 변환됨)
+        """
+        events = self.db.get_events(after_seq=after_seq, limit=limit)
+        for event in events:
+            event['payload'] = json.loads(event['payload'])
+        return events
@@ -0,0 +1,278 @@
+"""
+멱등성 키(Idempotency-Key) 처리 모듈
+
+불안정한 네트워크에서 클라이언트가 같은 POST 요청을 다시 보내도
+세탁 시작/예약이 두 번 처리되지 않도록 합니다.
+요청에 Idempotency-Key 헤더가 있으면 처음 처리한 응답을 저장해 두고,
+같은 키로 다시 오면 WashingMachineSystem을 호출하지 않고 저장된 응답을 그대로 돌려줍니다.
+
+저장소:
+    - 메모리: 크기 제한이 있는 LRU 캐시 (만료 시간 TTL)
+    - SQLite: 재시작 후에도 유지. 상태 서버 모드에서는 상태 서버를 거쳐 저장하므로
+      재시도가 다른 웹 프로세스로 가도 중복 처리되지 않습니다.
+      처리를 시작할 때 키를 "처리 중"으로 선점하므로, 첫 요청이 아직 처리 중일 때 다른 프로세스로 간
+      재시도는 그 처리가 끝날 때까지 기다렸다가 같은 응답을 받습니다.
+
+설정 (환경 변수):
+    IDEMPOTENCY_TTL_SECONDS: 저장한 응답의 유효 시간(초) (기본 86400, 하루)
+    IDEMPOTENCY_CACHE_SIZE: 메모리에 보관할 최대 키 개수 (기본 10000)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, Response, g, jsonify, request
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# 저장소에서 "처리 중"을 나타내는 상태 코드
+PENDING_STATUS = 0
+
+# 다른 프로세스가 처리 중인 키를 다시 확인하는 간격(초)
+POLL_SECONDS = 0.1
+
+# 저장된 응답: (요청 지문, 상태 코드, 응답 본문, 저장 시각(epoch 초))
+Entry = Tuple[str, int, str, float]
+
+
+class IdempotencyCache:
+    """
+    멱등성 키별 응답 저장소 겸 Flask 훅
+    
+    같은 키의 요청이 동시에 들어오면 먼저 온 요청이 끝날 때까지 기다렸다가 그 응답을 돌려줍니다.
+    5xx 응답은 저장하지 않으므로 서버 오류 뒤의 재시도는 다시 처리됩니다.
+    """
+    
+    def __init__(self, store=None, ttl_seconds: int = 86400,
+                 capacity: int = 10000, wait_seconds: float = 10, stale_seconds: float = 60):
+        """
+        저장소 초기화
+        
+        Args:
+            store: 응답을 영구 저장할 곳 (Database, WashingMachineSystem 또는 StateClient,
+                   없으면 메모리만 사용)
+            ttl_seconds: 저장한 응답의 유효 시간(초)
+            capacity: 메모리에 보관할 최대 키 개수
+            wait_seconds: 같은 키의 요청이 처리 중일 때 기다리는 최대 시간(초)
+            stale_seconds: 처리 중 표시가 이보다 오래되면 처리하던 프로세스가 멈춘 것으로 봄
+        """
+        self.store = store
+        self.stale_seconds = stale_seconds
+        self.ttl_seconds = ttl_seconds
+        self.capacity = capacity
+        self.wait_seconds = wait_seconds
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._in_flight: Dict[str, threading.Event] = {}  # 처리 중인 키
+        self._lock = threading.Lock()
+        self._saved = 0
+    
+    @classmethod
+    def from_env(cls, store=None) -> 'IdempotencyCache':
+        """환경 변수 설정으로 저장소 생성"""
+        return cls(
+            store=store,
+            ttl_seconds=int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '86400') or 86400),
+            capacity=int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000') or 10000)
+        )
+    
+    def init_app(self, app: Flask):
+        """
+        Flask 앱에 훅 등록
+        
+        Args:
+            app: Flask 애플리케이션
+        """
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+    
+    def _lookup(self, key: str) -> Optional[Entry]:
+        """
+        저장된 응답 조회 (메모리 → 데이터베이스 순)
+        
+        Args:
+            key: 멱등성 키
+        
+        Returns:
+            저장된 응답. 없거나 만료되었으면 None
+            (다른 프로세스가 처리 중이면 상태 코드가 PENDING_STATUS)
+        """
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[3] >= cutoff:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+        
+        if self.store is None:
+            return None
+        row = self.store.get_idempotency_key(key)
+        if row is None:
+            return None
+        entry = (row['fingerprint'], row['status'], row['response'],
+                 datetime.fromisoformat(row['created_at']).timestamp())
+        if entry[1] == PENDING_STATUS:
+            return entry if entry[3] >= time.time() - self.stale_seconds else None
+        if entry[3] < cutoff:
+            return None
+        self._remember(key, entry)
+        return entry
+    
+    def _remember(self, key: str, entry: Entry):
+        """메모리 캐시에 저장 (가득 차면 가장 오래 안 쓴 키부터 제거)"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+    
+    def _store(self, key: str, fingerprint: str, status: int, body: str):
+        """
+        처리한 응답 저장
+        
+        Args:
+            key: 멱등성 키
+            fingerprint: 요청 지문
+            status: 응답 상태 코드
+            body: 응답 본문
+        """
+        now = datetime.now()
+        self._remember(key, (fingerprint, status, body, now.timestamp()))
+        if self.store is None:
+            return
+        self.store.save_idempotency_key(key, fingerprint, status, body, now)
+        
+        # 가끔 만료된 키를 한 번에 정리
+        self._saved += 1
+        if self._saved % 500 == 0:
+            self.store.delete_idempotency_keys(now - timedelta(seconds=self.ttl_seconds))
+    
+    def _claim(self, key: str, fingerprint: str) -> bool:
+        """
+        다른 프로세스와 겹치지 않도록 키를 처리 중으로 선점
+        
+        Returns:
+            선점 여부 (저장소가 없으면 항상 True)
+        """
+        if self.store is None:
+            return True
+        now = datetime.now()
+        return self.store.claim_idempotency_key(key, fingerprint, now, now - timedelta(seconds=self.stale_seconds))
+    
+    @staticmethod
+    def _fingerprint() -> str:
+        """현재 요청의 지문 (같은 키를 다른 요청에 재사용했는지 확인용)"""
+        digest = hashlib.sha256()
+        digest.update(f"{request.method} {request.path}\n".encode())
+        digest.update(request.get_data())
+        return digest.hexdigest()
+    
+    def _replay(self, entry: Entry, fingerprint: str):
+        """저장된 응답을 그대로 다시 보냄"""
+        stored_fingerprint, status, body, _ = entry
+        if stored_fingerprint != fingerprint:
+            return jsonify({
+                "success": False,
+                "message": "같은 Idempotency-Key가 다른 요청에 이미 사용되었습니다."
+            }), 422
+        return Response(body, status=status, mimetype='application/json', headers={REPLAYED_HEADER: 'true'})
+    
+    def _before(self):
+        """키가 있는 POST 요청이면 저장된 응답을 돌려주거나 처리 중으로 표시"""
+        if request.method != 'POST':
+            return None
+        key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key:
+            return None
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({
+                "success": False,
+                "message": f"Idempotency-Key는 {MAX_KEY_LENGTH}자 이하여야 합니다."
+            }), 400
+        
+        fingerprint = self._fingerprint()
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            entry = self._lookup(key)
+            if entry is not None and entry[1] != PENDING_STATUS:
+                return self._replay(entry, fingerprint)
+            
+            mine = False
+            with self._lock:
+                # 조회하는 사이에 먼저 온 요청이 끝났을 수 있으므로 다시 확인
+                stored = self._entries.get(key)
+                event = self._in_flight.get(key)
+                if stored is None and event is None and entry is None:
+                    event = self._in_flight[key] = threading.Event()
+                    mine = True
+            if stored is not None:
+                return self._replay(stored, fingerprint)
+            
+            if mine:
+                if self._claim(key, fingerprint):
+                    g.idempotency = (key, fingerprint)
+                    return None
+                self._finish(key)  # 다른 프로세스가 먼저 선점함
+                event = None
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return jsonify({
+                    "success": False,
+                    "message": "같은 요청을 처리하는 중입니다. 잠시 후 다시 시도해주세요."
+                }), 409
+            if event is not None:
+                # 같은 프로세스에서 처리 중: 끝날 때까지 기다린 뒤 저장된 응답 사용
+                event.wait(remaining)
+            else:
+                # 다른 프로세스에서 처리 중: 저장될 때까지 주기적으로 확인
+                time.sleep(min(POLL_SECONDS, remaining))
+    
+    def _after(self, response: Response) -> Response:
+        """처리한 응답 저장 (5xx와 스트리밍 응답은 저장하지 않음)"""
+        pending = g.pop('idempotency', None)
+        if pending is None:
+            return response
+        key, fingerprint = pending
+        stored = False
+        try:
+            if response.status_code < 500 and not response.is_streamed:
+                self._store(key, fingerprint, response.status_code, response.get_data(as_text=True))
+                stored = True
+        finally:
+            self._finish(key, release=not stored)
+        return response
+    
+    def _teardown(self, exc: Optional[BaseException] = None):
+        """예외로 after_request가 실행되지 않은 경우 처리 중 표시 해제"""
+        pending = g.pop('idempotency', None)
+        if pending is not None:
+            self._finish(pending[0], release=True)
+    
+    def _finish(self, key: str, release: bool = False):
+        """
+        처리 중 표시를 지우고 기다리던 요청을 깨움
+        
+        Args:
+            key: 멱등성 키
+            release: 응답을 저장하지 않았으면 True (저장소의 처리 중 표시도 삭제해 재시도가 다시 처리되게 함)
+        """
+        try:
+            if release and self.store is not None:
+                self.store.release_idempotency_key(key)
+        except Exception as e:
+            print(f"멱등성 키 해제 중 오류 발생: {e}")
+        finally:
+            with self._lock:
+                event = self._in_flight.pop(key, None)
+            if event is not None:
+                event.set()
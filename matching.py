@@ -0,0 +1,214 @@
+"""
+기기 배정(매칭) 엔진 모듈
+
+세탁기/건조기를 종류와 용량별로 나누어 관리하고,
+세탁물 무게에 맞는 가장 작은(가장 잘 맞는) 빈 기기를 골라 배정합니다.
+같은 용량이면 누적 사용 횟수가 적은 기기를 먼저 골라 마모를 분산합니다.
+
+자료구조:
+    - 빈 기기: 종류 → 용량 → (사용 횟수, 기기 번호) 최소 힙
+    - 대기열: (종류, 필요한 용량) → 예약 시간 순 큐
+
+배정과 반납은 O(log n)이며, 대기열 선택은 용량 종류 수만큼만 비교합니다.
+취소/만료된 예약과 이미 배정된 기기는 꺼낼 때 건너뛰는 방식(지연 삭제)으로 정리합니다.
+데이터베이스가 원본이며, 이 엔진은 WashingMachineSystem 잠금 안에서만 사용되는 메모리 색인입니다.
+"""
+
+import bisect
+import heapq
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from models import MachineStatus, MachineType
+
+
+class MatchingEngine:
+    """
+    기기 종류별 빈 기기 목록과 대기열을 관리하는 배정 엔진
+    """
+    
+    def __init__(self):
+        """빈 엔진 생성 (load()로 데이터베이스 상태를 불러옵니다)"""
+        self.machines: Dict[int, dict] = {}        # 기기 번호 → {machine_type, capacity_kg, usage_count}
+        self.capacities: Dict[MachineType, List[int]] = {}  # 종류별 용량 목록 (오름차순)
+        self._free_heaps: Dict[Tuple[MachineType, int], List[Tuple[int, int]]] = {}
+        self._free: set = set()                    # 현재 비어 있는 기기 번호
+        self._queues: Dict[Tuple[MachineType, int], Deque[dict]] = {}
+        self._waiting: Dict[int, dict] = {}        # 대기 중인 예약 ID → 예약
+        self._waiting_counts: Counter = Counter()  # 종류별 대기 예약 수
+    
+    def load(self, machines: List[dict], reservations: List[dict]):
+        """
+        데이터베이스 조회 결과로 색인을 다시 만듦
+        
+        Args:
+            machines: 세탁기 행 리스트 (machine_type, capacity_kg, usage_count 포함)
+            reservations: 예약 행 리스트 (예약 시간 순)
+        """
+        self.__init__()
+        for machine in machines:
+            machine_type = MachineType(machine['machine_type'])
+            self.machines[machine['machine_id']] = {
+                "machine_type": machine_type,
+                "capacity_kg": machine['capacity_kg'],
+                "usage_count": machine['usage_count']
+            }
+            capacities = self.capacities.setdefault(machine_type, [])
+            if machine['capacity_kg'] not in capacities:
+                bisect.insort(capacities, machine['capacity_kg'])
+        
+        for machine in machines:
+            if machine['status'] == MachineStatus.AVAILABLE.value:
+                self.release(machine['machine_id'])
+        for reservation in reservations:
+            self.enqueue(reservation)
+    
+    def fit_capacity(self, machine_type: MachineType, load_kg: int) -> Optional[int]:
+        """
+        세탁물을 받을 수 있는 가장 작은 용량
+        
+        Args:
+            machine_type: 기기 종류
+            load_kg: 세탁물 무게 (kg)
+        
+        Returns:
+            용량 (kg). 해당 종류에 충분히 큰 기기가 없으면 None
+        """
+        capacities = self.capacities.get(machine_type, [])
+        index = bisect.bisect_left(capacities, load_kg)
+        return capacities[index] if index < len(capacities) else None
+    
+    def find(self, machine_type: MachineType, load_kg: int = 0) -> Optional[int]:
+        """
+        배정할 빈 기기 찾기 (꺼내지는 않음)
+        
+        용량이 맞는 것 중 가장 작은 용량 → 사용 횟수가 적은 기기 → 번호가 작은 기기 순입니다.
+        
+        Args:
+            machine_type: 기기 종류
+            load_kg: 세탁물 무게 (kg)
+        
+        Returns:
+            기기 번호. 빈 기기가 없으면 None
+        """
+        capacities = self.capacities.get(machine_type, [])
+        for capacity in capacities[bisect.bisect_left(capacities, load_kg):]:
+            heap = self._free_heaps.get((machine_type, capacity))
+            while heap:
+                usage_count, machine_id = heap[0]
+                if machine_id in self._free and usage_count == self.machines[machine_id]['usage_count']:
+                    return machine_id
+                heapq.heappop(heap)  # 이미 배정되었거나 사용 횟수가 바뀐 항목
+        return None
+    
+    def acquire(self, machine_id: int):
+        """
+        기기를 사용 중으로 표시하고 사용 횟수 증가
+        
+        Args:
+            machine_id: 기기 번호
+        """
+        self._free.discard(machine_id)
+        self.machines[machine_id]['usage_count'] += 1
+    
+    def release(self, machine_id: int):
+        """
+        기기를 빈 기기 목록에 넣음
+        
+        Args:
+            machine_id: 기기 번호
+        """
+        machine = self.machines[machine_id]
+        self._free.add(machine_id)
+        heap = self._free_heaps.setdefault((machine['machine_type'], machine['capacity_kg']), [])
+        heapq.heappush(heap, (machine['usage_count'], machine_id))
+    
+    def enqueue(self, reservation: dict):
+        """
+        예약을 종류/용량별 대기열에 추가
+        
+        Args:
+            reservation: 예약 행 (id, user_name, machine_type, load_kg, reservation_time 포함)
+        """
+        machine_type = MachineType(reservation['machine_type'])
+        capacity = self.fit_capacity(machine_type, reservation['load_kg'])
+        if capacity is None:
+            return  # 받을 수 있는 기기가 없는 예약 (기기 구성 변경 후)
+        self._waiting[reservation['id']] = reservation
+        self._waiting_counts[machine_type] += 1
+        self._queues.setdefault((machine_type, capacity), deque()).append(reservation)
+    
+    def remove_reservations(self, reservation_ids: List[int]) -> List[dict]:
+        """
+        취소/만료된 예약 제거 (대기열에서는 꺼낼 때 건너뜀)
+        
+        Args:
+            reservation_ids: 예약 ID 리스트
+        
+        Returns:
+            제거된 예약 리스트 (대기 중이 아니던 ID는 제외)
+        """
+        removed = []
+        for reservation_id in reservation_ids:
+            reservation = self._waiting.pop(reservation_id, None)
+            if reservation is not None:
+                self._waiting_counts[MachineType(reservation['machine_type'])] -= 1
+                removed.append(reservation)
+        return removed
+    
+    def remove_user(self, user_name: str):
+        """
+        사용자의 모든 예약 제거
+        
+        Args:
+            user_name: 예약자 이름
+        """
+        self.remove_reservations([
+            reservation_id for reservation_id, reservation in self._waiting.items()
+            if reservation['user_name'] == user_name
+        ])
+    
+    def _queue_head(self, key: Tuple[MachineType, int]) -> Optional[dict]:
+        """대기열의 첫 번째 유효한 예약 (취소/만료된 예약은 버림)"""
+        queue = self._queues.get(key)
+        while queue:
+            if queue[0]['id'] in self._waiting:
+                return queue[0]
+            queue.popleft()
+        return None
+    
+    def next_reservation(self, machine_id: int) -> Optional[dict]:
+        """
+        비게 된 기기를 받을 예약 찾기 (꺼내지는 않음)
+        
+        같은 종류이고 이 기기 용량 이하의 대기열 중 가장 먼저 들어온 예약입니다.
+        
+        Args:
+            machine_id: 비게 된 기기 번호
+        
+        Returns:
+            예약 행. 받을 예약이 없으면 None
+        """
+        machine = self.machines[machine_id]
+        machine_type = machine['machine_type']
+        capacities = self.capacities.get(machine_type, [])
+        candidates = []
+        for capacity in capacities[:bisect.bisect_right(capacities, machine['capacity_kg'])]:
+            head = self._queue_head((machine_type, capacity))
+            if head is not None:
+                candidates.append(head)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda r: (r['reservation_time'], r['id']))
+    
+    def waiting_count(self, machine_type: MachineType) -> int:
+        """
+        해당 종류 기기를 기다리는 예약 수
+        
+        Args:
+            machine_type: 기기 종류
+        
+        Returns:
+            예약 수
+        """
+        return self._waiting_counts[machine_type]
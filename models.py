@@ -6,7 +6,7 @@
 
 from datetime import datetime, timedelta
 from enum import Enum
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 class MachineStatus(Enum):
@@ -16,6 +16,64 @@ class MachineStatus(Enum):
     COMPLETED = "완료"           # 세탁 완료 (옷을 가져가기 대기 중)
 
 
+class MachineType(Enum):
+    """기기 종류를 나타내는 열거형"""
+    WASHER = "세탁기"
+    DRYER = "건조기"
+
+
+# 기기 종류별 기본 사용 시간 (분)
+DEFAULT_DURATIONS = {
+    MachineType.WASHER: 30,
+    MachineType.DRYER: 40,
+}
+
+# 용량을 지정하지 않은 기기의 기본 용량 (kg)
+DEFAULT_CAPACITY_KG = 10
+
+
+def parse_fleet(spec: str) -> List[Tuple[MachineType, int]]:
+    """
+    기기 구성 문자열 해석
+    
+    예: "washer:8,washer:12,dryer:10" → 8kg 세탁기, 12kg 세탁기, 10kg 건조기
+    (용량을 생략하면 DEFAULT_CAPACITY_KG)
+    
+    Args:
+        spec: 쉼표로 구분된 "종류:용량" 목록 (종류는 washer, dryer)
+    
+    Returns:
+        (기기 종류, 용량) 리스트 (순서대로 1번, 2번, ... 기기)
+    
+    Raises:
+        ValueError: 형식이 잘못된 경우
+    """
+    fleet = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, capacity = item.partition(':')
+        try:
+            machine_type = MachineType[name.strip().upper()]
+        except KeyError:
+            raise ValueError(f"알 수 없는 기기 종류입니다: {name}")
+        fleet.append((machine_type, int(capacity) if capacity else DEFAULT_CAPACITY_KG))
+    return fleet
+
+
+class EventType(Enum):
+    """이벤트 저널에 기록되는 상태 변경 이벤트 종류"""
+    WASH_STARTED = "WashStarted"                  # 세탁 시작 (예약 자동 할당 포함)
+    WASH_COMPLETED = "WashCompleted"              # 세탁 시간 종료
+    COLLECTED = "Collected"                       # 옷 가져감 (세탁기 비움)
+    RESERVED = "Reserved"                         # 대기 예약 생성
+    RESERVATION_EXPIRED = "ReservationExpired"    # 예약 만료
+    RESERVATION_CANCELLED = "ReservationCancelled"  # 사용자가 예약 취소
+    NOTIFICATION_SENT = "NotificationSent"        # 알림 생성
+    END_TIME_ADJUSTED = "EndTimeAdjusted"         # 세탁기 보고값(텔레메트리)으로 종료 시간 보정
+
+
 class Machine:
     """
     개별 세탁기를 나타내는 클래스
@@ -23,14 +81,21 @@ class Machine:
     각 세탁기는 고유한 ID와 상태, 사용자 정보를 가집니다.
     """
     
-    def __init__(self, machine_id: int):
+    def __init__(self, machine_id: int, machine_type: MachineType = MachineType.WASHER,
+                 capacity_kg: int = DEFAULT_CAPACITY_KG):
         """
         세탁기 초기화
         
         Args:
             machine_id: 세탁기 고유 번호 (1, 2, 3, ...)
+            machine_type: 기기 종류 (세탁기/건조기)
+            capacity_kg: 용량 (kg)
         """
         self.machine_id = machine_id
+        self.machine_type = machine_type
+        self.capacity_kg = capacity_kg
+        self.usage_count = 0  # 누적 사용 횟수 (마모 분산용)
+        self.then_dry = False  # 세탁 후 건조기 연결 여부
         self.status = MachineStatus.AVAILABLE
         self.user_name: Optional[str] = None
         self.start_time: Optional[datetime] = None
@@ -87,9 +152,14 @@ class Machine:
         """
         return {
             "machine_id": self.machine_id,
+            "machine_type": self.machine_type.value,
+            "capacity_kg": self.capacity_kg,
+            "usage_count": self.usage_count,
+            "then_dry": self.then_dry,
             "status": self.status.value,
             "user_name": self.user_name,
             "remaining_minutes": self.get_remaining_minutes(),
+            "start_time": self.start_time.isoformat() if self.start_time else None,
             "end_time": self.end_time.isoformat() if self.end_time else None
         }
 
@@ -101,15 +171,20 @@ class Reservation:
     모든 세탁기가 사용 중일 때 대기 예약을 관리합니다.
     """
     
-    def __init__(self, user_name: str, reservation_time: datetime = None):
+    def __init__(self, user_name: str, reservation_time: datetime = None,
+                 machine_type: MachineType = MachineType.WASHER, load_kg: int = 0):
         """
         예약 초기화
         
         Args:
             user_name: 예약자 이름
             reservation_time: 예약 시간 (기본값: 현재 시간)
+            machine_type: 기다리는 기기 종류
+            load_kg: 세탁물 무게 (kg, 이 용량 이상인 기기만 배정)
         """
         self.user_name = user_name
+        self.machine_type = machine_type
+        self.load_kg = load_kg
         self.reservation_time = reservation_time or datetime.now()
         self.expiry_time = self.reservation_time + timedelta(minutes=5)  # 5분 후 자동 취소
     
@@ -131,6 +206,8 @@ class Reservation:
         """
         return {
             "user_name": self.user_name,
+            "machine_type": self.machine_type.value,
+            "load_kg": self.load_kg,
             "reservation_time": self.reservation_time.isoformat(),
             "expiry_time": self.expiry_time.isoformat(),
             "is_expired": self.is_expired()
@@ -0,0 +1,478 @@
+"""
+알림 발송(디스패처) 모듈
+
+세탁 완료/기기 배정 알림을 화면 폴링(/api/notifications)뿐 아니라
+웹훅, 이메일(SMTP), 파일 같은 외부 채널로도 보냅니다.
+
+요청 경로에서는 큐에 넣기만 하므로(submit) 채널이 느리거나 멈춰 있어도
+complete_washing이나 상태 확인 작업이 기다리지 않습니다.
+
+구조:
+    submit() → 입력 큐(크기 제한) → 스케줄러 스레드가 채널별로 묶음(batch) 구성
+    → 작업자 스레드 풀이 채널로 전송 → 실패하면 지수 백오프로 재시도
+    → 최대 시도 횟수를 넘으면 데드레터 테이블에 저장
+
+설정 (환경 변수):
+    NOTIFY_WEBHOOK_URL: 알림 묶음을 JSON으로 POST할 주소
+    NOTIFY_SMTP_HOST: SMTP 서버 (NOTIFY_SMTP_TO와 함께 설정하면 이메일 발송)
+    NOTIFY_SMTP_PORT: SMTP 포트 (기본 25)
+    NOTIFY_SMTP_USER / NOTIFY_SMTP_PASSWORD: SMTP 로그인 정보 (선택)
+    NOTIFY_SMTP_STARTTLS: 1이면 STARTTLS 사용
+    NOTIFY_SMTP_FROM: 보내는 주소 (기본 laundry@localhost)
+    NOTIFY_SMTP_TO: 받는 주소 형식 (예: "{user_name}@dorm.example.com")
+    NOTIFY_FILE: 알림을 한 줄에 하나씩 JSON으로 추가할 파일 경로 (테스트/로컬 확인용)
+    NOTIFY_WORKERS: 전송 작업자 스레드 수 (기본 2)
+    NOTIFY_BATCH_SIZE: 한 번에 보낼 최대 알림 수 (기본 20)
+    NOTIFY_MAX_ATTEMPTS: 데드레터로 보내기 전 최대 시도 횟수 (기본 5)
+
+채널을 하나도 설정하지 않으면 스레드를 만들지 않고 아무 일도 하지 않습니다.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import queue
+import random
+import re
+import smtplib
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import getaddresses
+from typing import Dict, List, Optional
+
+from database import Database
+
+# 이메일 주소를 만들 때 사용자 이름에 들어가면 안 되는 문자 (주소 구분자, 따옴표, 공백 등)
+UNSAFE_ADDRESS_CHARS = re.compile(r'[@,;:<>()\[\]"\\\s]')
+
+
+class DeliveryError(Exception):
+    """
+    묶음 중 일부만 전송에 실패했을 때 채널이 발생시키는 예외
+    
+    failed에 담긴 알림만 재시도하므로 이미 보낸 알림이 중복 발송되지 않습니다.
+    rejected에 담긴 알림은 다시 보내도 소용이 없으므로 재시도 없이 바로 데드레터로 보냅니다.
+    """
+    
+    def __init__(self, failed: List[dict], message: str, rejected: Optional[List[dict]] = None):
+        """
+        Args:
+            failed: 보내지 못한 알림 리스트 (재시도)
+            message: 오류 메시지
+            rejected: 보낼 수 없는 알림 리스트 (재시도 안 함)
+        """
+        super().__init__(message)
+        self.failed = failed
+        self.rejected = rejected or []
+
+
+class Channel(ABC):
+    """
+    알림 채널 기본 클래스 (추상 클래스)
+    
+    send()는 묶음 전체를 보내고, 실패하면 예외를 발생시킵니다.
+    send()를 구현하지 않은 채널은 만들 때 바로 TypeError가 발생합니다.
+    일반 예외는 묶음 전체를, DeliveryError는 그 안의 알림만 재시도합니다.
+    """
+    
+    name = "channel"
+    
+    @abstractmethod
+    def send(self, notifications: List[dict]):
+        """
+        알림 묶음 전송
+        
+        Args:
+            notifications: 알림 리스트 (user_name, message, timestamp)
+        """
+
+
+class WebhookChannel(Channel):
+    """묶음을 {"notifications": [...]} JSON 본문으로 POST하는 채널 (2xx가 아니면 실패)"""
+    
+    name = "webhook"
+    
+    def __init__(self, url: str, timeout: float = 5):
+        """
+        Args:
+            url: 웹훅 주소
+            timeout: 요청 제한 시간(초)
+        """
+        self.url = url
+        self.timeout = timeout
+    
+    def send(self, notifications: List[dict]):
+        """묶음을 한 번의 POST로 전송"""
+        body = json.dumps({"notifications": notifications}, ensure_ascii=False).encode('utf-8')
+        req = urllib.request.Request(
+            self.url, data=body, method='POST',
+            headers={'Content-Type': 'application/json; charset=utf-8'}
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            response.read()
+
+
+class SmtpChannel(Channel):
+    """
+    알림마다 이메일 한 통씩 보내는 채널
+    
+    묶음 하나는 SMTP 연결 하나로 보냅니다. 받는 주소는 사용자 이름으로 만듭니다.
+    """
+    
+    name = "email"
+    
+    def __init__(self, host: str, recipient: str, port: int = 25, sender: str = 'laundry@localhost',
+                 username: str = '', password: str = '', starttls: bool = False, timeout: float = 10):
+        """
+        Args:
+            host: SMTP 서버
+            recipient: 받는 주소 형식 ({user_name} 자리에 사용자 이름이 들어감)
+            port: SMTP 포트
+            sender: 보내는 주소
+            username: 로그인 사용자 (빈 문자열이면 로그인 안 함)
+            password: 로그인 비밀번호
+            starttls: STARTTLS 사용 여부
+            timeout: 연결 제한 시간(초)
+        """
+        self.host = host
+        self.recipient = recipient
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+    
+    def address_for(self, user_name: str) -> Optional[str]:
+        """
+        사용자 이름으로 받는 주소 만들기
+        
+        사용자 이름은 누구나 입력할 수 있으므로 주소 구분자(@ , < > 등)나 공백이 들어 있으면
+        다른 주소로 메일이 가지 않도록 주소를 만들지 않습니다.
+        
+        Args:
+            user_name: 사용자 이름
+        
+        Returns:
+            받는 주소. 사용할 수 없는 이름이면 None
+        """
+        if not user_name or UNSAFE_ADDRESS_CHARS.search(user_name):
+            return None
+        address = self.recipient.format(user_name=user_name)
+        parsed = getaddresses([address])
+        if len(parsed) != 1 or parsed[0][1] != address:
+            return None
+        return address
+    
+    def send(self, notifications: List[dict]):
+        """알림마다 이메일 전송 (중간에 실패하면 남은 알림만 DeliveryError로 알림)"""
+        deliverable, rejected = [], []
+        for notification in notifications:
+            address = self.address_for(notification['user_name'])
+            if address is None:
+                rejected.append(notification)
+            else:
+                deliverable.append((address, notification))
+        
+        if deliverable:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password)
+                
+                for index, (address, notification) in enumerate(deliverable):
+                    message = EmailMessage()
+                    message['Subject'] = "세탁기 알림"
+                    message['From'] = self.sender
+                    message['To'] = address
+                    message.set_content(f"{notification['message']}\n\n({notification['timestamp']})")
+                    try:
+                        smtp.send_message(message)
+                    except (smtplib.SMTPException, OSError) as e:
+                        raise DeliveryError([n for _, n in deliverable[index:]], str(e), rejected) from e
+        
+        if rejected:
+            raise DeliveryError([], "이메일 주소로 쓸 수 없는 사용자 이름", rejected)
+
+
+class FileChannel(Channel):
+    """알림을 파일에 한 줄에 하나씩 JSON으로 추가하는 채널 (테스트/로컬 확인용)"""
+    
+    name = "file"
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 파일 경로
+        """
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def send(self, notifications: List[dict]):
+        """묶음을 파일 끝에 추가"""
+        lines = "".join(json.dumps(n, ensure_ascii=False) + "\n" for n in notifications)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+class NotificationDispatcher:
+    """
+    알림을 채널별로 묶어 비동기로 보내는 디스패처
+    
+    submit()은 큐에 넣기만 하고 바로 반환합니다(큐가 가득 차면 버리고 dropped를 늘림).
+    버려지거나 데드레터로 간 알림도 notifications 테이블에는 남아 있으므로 화면에서는 볼 수 있습니다.
+    """
+    
+    def __init__(self, channels: List[Channel], db: Optional[Database] = None, workers: int = 2,
+                 queue_size: int = 1000, batch_size: int = 20, batch_wait: float = 0.5,
+                 max_attempts: int = 5, base_delay: float = 1, max_delay: float = 300):
+        """
+        디스패처 초기화
+        
+        Args:
+            channels: 알림 채널 리스트
+            db: 데드레터를 저장할 데이터베이스 (없으면 로그만 출력)
+            workers: 전송 작업자 스레드 수
+            queue_size: 입력 큐 최대 크기
+            batch_size: 한 번에 보낼 최대 알림 수
+            batch_wait: 묶음을 채우기 위해 기다리는 최대 시간(초)
+            max_attempts: 데드레터로 보내기 전 최대 시도 횟수
+            base_delay: 첫 재시도 대기 시간(초), 시도할 때마다 두 배
+            max_delay: 재시도 대기 시간 상한(초)
+        """
+        self.channels = channels
+        self.db = db
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=queue_size)
+        self._pending: Dict[str, List[dict]] = {channel.name: [] for channel in channels}
+        self._pending_since: Dict[str, float] = {}
+        self._retries: List[tuple] = []  # (재시도 시각, 순번, 채널, 묶음, 다음 시도 번호) 최소 힙
+        self._sequence = itertools.count()
+        self._slots = threading.BoundedSemaphore(workers * 2)  # 작업자 풀에 넘긴 묶음 수 제한
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.stats = {"sent": 0, "retried": 0, "dead_lettered": 0, "dropped": 0}
+    
+    @classmethod
+    def from_env(cls, db: Optional[Database] = None) -> 'NotificationDispatcher':
+        """환경 변수 설정으로 디스패처 생성"""
+        channels: List[Channel] = []
+        if os.environ.get('NOTIFY_WEBHOOK_URL'):
+            channels.append(WebhookChannel(os.environ['NOTIFY_WEBHOOK_URL']))
+        if os.environ.get('NOTIFY_SMTP_HOST') and os.environ.get('NOTIFY_SMTP_TO'):
+            channels.append(SmtpChannel(
+                host=os.environ['NOTIFY_SMTP_HOST'],
+                recipient=os.environ['NOTIFY_SMTP_TO'],
+                port=int(os.environ.get('NOTIFY_SMTP_PORT', '25') or 25),
+                sender=os.environ.get('NOTIFY_SMTP_FROM', 'laundry@localhost'),
+                username=os.environ.get('NOTIFY_SMTP_USER', ''),
+                password=os.environ.get('NOTIFY_SMTP_PASSWORD', ''),
+                starttls=os.environ.get('NOTIFY_SMTP_STARTTLS', '') == '1'
+            ))
+        if os.environ.get('NOTIFY_FILE'):
+            channels.append(FileChannel(os.environ['NOTIFY_FILE']))
+        return cls(
+            channels,
+            db=db,
+            workers=int(os.environ.get('NOTIFY_WORKERS', '2') or 2),
+            batch_size=int(os.environ.get('NOTIFY_BATCH_SIZE', '20') or 20),
+            max_attempts=int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '5') or 5)
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """채널이 하나라도 설정되어 있는지 여부"""
+        return bool(self.channels)
+    
+    def submit(self, user_name: str, message: str, timestamp: Optional[datetime] = None):
+        """
+        알림을 발송 큐에 추가 (기다리지 않음)
+        
+        Args:
+            user_name: 받을 사용자 이름
+            message: 알림 메시지
+            timestamp: 알림 시간 (없으면 지금)
+        """
+        if not self.enabled:
+            return
+        notification = {
+            "user_name": user_name,
+            "message": message,
+            "timestamp": (timestamp or datetime.now()).isoformat()
+        }
+        try:
+            self._queue.put_nowait(notification)
+        except queue.Full:
+            with self._lock:
+                self.stats["dropped"] += 1
+    
+    def start(self) -> 'NotificationDispatcher':
+        """스케줄러 스레드와 작업자 풀 시작 (채널이 없으면 아무것도 하지 않음)"""
+        if self.enabled and self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='notifier')
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self, timeout: float = 10):
+        """
+        디스패처 종료
+        
+        큐와 묶음에 남은 알림은 한 번 보내 보고, 재시도를 기다리던 알림은 데드레터로 보냅니다.
+        
+        Args:
+            timeout: 스케줄러 스레드를 기다리는 최대 시간(초)
+        """
+        self._stopped.set()
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            retries, self._retries = self._retries, []
+        for _, _, channel, batch, attempt in retries:
+            self._dead_letter(channel, batch, attempt - 1, "종료 시 재시도 대기 중")
+    
+    def _run(self):
+        """스케줄러: 큐에서 알림을 꺼내 채널별로 묶고, 때가 된 묶음과 재시도를 작업자에게 넘김"""
+        while True:
+            stopping = self._stopped.is_set()
+            try:
+                notification = self._queue.get(timeout=0 if stopping else self._next_wakeup())
+                now = time.monotonic()
+                for name, pending in self._pending.items():
+                    if not pending:
+                        self._pending_since[name] = now
+                    pending.append(notification)
+            except queue.Empty:
+                pass
+            
+            now = time.monotonic()
+            for channel in self.channels:
+                pending = self._pending[channel.name]
+                if pending and (stopping or len(pending) >= self.batch_size
+                                or now - self._pending_since[channel.name] >= self.batch_wait):
+                    self._pending[channel.name] = []
+                    self._submit_batch(channel, pending, 1)
+            
+            for channel, batch, attempt in self._due_retries(now):
+                self._submit_batch(channel, batch, attempt)
+            
+            if stopping and self._queue.empty() and not any(self._pending.values()):
+                return
+    
+    def _next_wakeup(self) -> float:
+        """큐를 기다릴 최대 시간 (가장 빠른 묶음 마감 또는 재시도 시각까지)"""
+        now = time.monotonic()
+        deadlines = [since + self.batch_wait for name, since in self._pending_since.items() if self._pending[name]]
+        with self._lock:
+            if self._retries:
+                deadlines.append(self._retries[0][0])
+        if not deadlines:
+            return 1.0
+        return min(1.0, max(0.0, min(deadlines) - now))
+    
+    def _due_retries(self, now: float) -> List[tuple]:
+        """재시도 시각이 된 묶음 꺼내기"""
+        due = []
+        with self._lock:
+            while self._retries and self._retries[0][0] <= now:
+                _, _, channel, batch, attempt = heapq.heappop(self._retries)
+                due.append((channel, batch, attempt))
+        return due
+    
+    def _submit_batch(self, channel: Channel, batch: List[dict], attempt: int):
+        """작업자 풀에 묶음 전송 맡기기 (작업자가 모두 바쁘면 빈자리가 날 때까지 기다림)"""
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._deliver, channel, batch, attempt)
+        except RuntimeError:
+            self._slots.release()  # 종료 중인 풀
+            self._dead_letter(channel, batch, attempt - 1, "디스패처 종료")
+    
+    def _deliver(self, channel: Channel, batch: List[dict], attempt: int):
+        """
+        묶음 전송 (작업자 스레드에서 실행)
+        
+        Args:
+            channel: 알림 채널
+            batch: 알림 묶음
+            attempt: 시도 번호 (1부터)
+        """
+        rejected = []
+        try:
+            channel.send(batch)
+            failed, error = [], None
+        except DeliveryError as e:
+            failed, rejected, error = e.failed, e.rejected, str(e)
+        except Exception as e:
+            failed, error = batch, str(e) or type(e).__name__
+        finally:
+            self._slots.release()
+        
+        with self._lock:
+            self.stats["sent"] += len(batch) - len(failed) - len(rejected)
+        if rejected:
+            self._dead_letter(channel, rejected, attempt, error)
+        if not failed:
+            return
+        
+        if attempt >= self.max_attempts:
+            self._dead_letter(channel, failed, attempt, error)
+            return
+        
+        # 지수 백오프 (여러 묶음이 한꺼번에 재시도하지 않도록 약간의 무작위 지연 추가)
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+        with self._lock:
+            self.stats["retried"] += len(failed)
+            heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), channel, failed, attempt + 1))
+    
+    def _dead_letter(self, channel: Channel, batch: List[dict], attempts: int, error: str):
+        """
+        보내지 못한 알림을 데드레터 테이블에 저장
+        
+        Args:
+            channel: 알림 채널
+            batch: 보내지 못한 알림 리스트
+            attempts: 시도한 횟수
+            error: 마지막 오류 메시지
+        """
+        with self._lock:
+            self.stats["dead_lettered"] += len(batch)
+        print(f"알림 {len(batch)}건을 {channel.name} 채널로 보내지 못했습니다: {error}")
+        if self.db is None:
+            return
+        try:
+            self.db.add_dead_letters(channel.name, batch, attempts, error, datetime.now())
+        except Exception as e:
+            print(f"데드레터 저장 중 오류 발생: {e}")
+    
+    def get_stats(self) -> dict:
+        """
+        발송 통계 조회
+        
+        Returns:
+            채널 목록, 보낸/재시도/데드레터/버린 알림 수, 큐에 남은 알림 수가 담긴 딕셔너리
+        """
+        with self._lock:
+            return {
+                "channels": [channel.name for channel in self.channels],
+                **self.stats,
+                "queued": self._queue.qsize(),
+                "waiting_retry": sum(len(item[3]) for item in self._retries)
+            }
@@ -0,0 +1,239 @@
+"""
+요청 단위 샘플링 프로파일러 모듈
+
+N개 요청 중 1개(또는 디버그 헤더가 붙은 요청)를 cProfile로 측정하여
+Flask → WashingMachineSystem → Database 구간 어디에서 시간이 쓰이는지 확인합니다.
+결과는 pstats 파일(.prof)로 디렉터리에 저장하며 오래된 파일은 자동으로 지웁니다.
+
+StartupTimer는 서버 시작 경로(모듈 로드 → 시스템 초기화 → 첫 응답)의 단계별 시간을 기록합니다.
+
+설정 (환경 변수):
+    PROFILE_SAMPLE_RATE: N개 요청 중 1개를 측정 (0이면 샘플링 안 함, 기본 0)
+    PROFILE_TOKEN: 요청 헤더 X-Profile 값이 이 토큰과 같으면 측정 (비어 있으면 헤더 무시)
+                   결과 조회(/api/profiles)에도 필요하며, 비어 있으면 샘플링만 하고 조회는 막습니다.
+    PROFILE_DIR: 결과 저장 디렉터리 (기본 profiles)
+    PROFILE_MAX_FILES: 보관할 최대 파일 수 (기본 50)
+
+둘 다 꺼져 있으면 Flask 훅 자체를 등록하지 않으므로 오버헤드가 없습니다.
+"""
+
+import cProfile
+import hmac
+import io
+import itertools
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from flask import Flask, g, request
+
+PROFILE_HEADER = 'X-Profile'
+
+# render_profile에서 허용하는 정렬 기준
+SORT_KEYS = {'cumulative', 'tottime', 'calls', 'ncalls', 'time', 'name'}
+
+
+class RequestProfiler:
+    """
+    Flask 요청 프로파일러
+    
+    before_request에서 측정을 시작하고 teardown_request에서 종료하여 파일로 저장합니다.
+    """
+    
+    def __init__(self, directory: str = 'profiles', sample_rate: int = 0,
+                 token: str = '', max_files: int = 50):
+        """
+        프로파일러 초기화
+        
+        Args:
+            directory: 결과 저장 디렉터리
+            sample_rate: N개 요청 중 1개를 측정 (0이면 샘플링 안 함)
+            token: 디버그 헤더로 측정을 요청할 때 필요한 토큰 (빈 문자열이면 헤더 무시)
+            max_files: 보관할 최대 파일 수
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_files = max_files
+        self._counter = itertools.count(1)
+    
+    @classmethod
+    def from_env(cls) -> 'RequestProfiler':
+        """환경 변수 설정으로 프로파일러 생성"""
+        return cls(
+            directory=os.environ.get('PROFILE_DIR', 'profiles'),
+            sample_rate=int(os.environ.get('PROFILE_SAMPLE_RATE', '0') or 0),
+            token=os.environ.get('PROFILE_TOKEN', ''),
+            max_files=int(os.environ.get('PROFILE_MAX_FILES', '50') or 50)
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """샘플링 또는 디버그 헤더 측정 중 하나라도 켜져 있는지 여부"""
+        return self.sample_rate > 0 or bool(self.token)
+    
+    def init_app(self, app: Flask):
+        """
+        Flask 앱에 훅 등록 (꺼져 있으면 아무것도 하지 않음)
+        
+        Args:
+            app: Flask 애플리케이션
+        """
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+    
+    def is_authorized(self) -> bool:
+        """
+        현재 요청이 프로파일 조회 권한이 있는지 확인
+        
+        프로파일에는 내부 호출 경로와 소요 시간이 담기므로, 샘플링만 켜져 있어도
+        토큰이 설정되어 있고 X-Profile 헤더가 토큰과 같을 때만 조회할 수 있습니다.
+        """
+        return bool(self.token) and hmac.compare_digest(
+            request.headers.get(PROFILE_HEADER, '').encode('utf-8'), self.token.encode('utf-8')
+        )
+    
+    def _should_profile(self) -> bool:
+        """현재 요청을 측정할지 결정"""
+        if self.token and request.headers.get(PROFILE_HEADER) == self.token:
+            return True
+        return self.sample_rate > 0 and next(self._counter) % self.sample_rate == 0
+    
+    def _start(self):
+        """요청 시작 시 측정 시작"""
+        if not self._should_profile():
+            return
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    
+    def _finish(self, exc: Optional[BaseException] = None):
+        """요청 종료 시 측정 종료 및 저장"""
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        elapsed_ms = (time.perf_counter() - g.pop('profile_started')) * 1000
+        
+        # 파일 이름: 시간_메서드_경로_소요시간ms.prof
+        path = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        filename = f"{datetime.now():%Y%m%dT%H%M%S%f}_{request.method}_{path}_{elapsed_ms:.0f}ms.prof"
+        try:
+            profiler.dump_stats(os.path.join(self.directory, filename))
+            self._rotate()
+        except OSError as e:
+            print(f"프로파일 저장 중 오류 발생: {e}")
+    
+    def _rotate(self):
+        """보관 개수를 넘는 오래된 파일 삭제"""
+        files = self._profile_files()
+        for name in files[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+    
+    def _profile_files(self) -> List[str]:
+        """저장된 프로파일 파일 이름 목록 (최신 순)"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((f for f in os.listdir(self.directory) if f.endswith('.prof')), reverse=True)
+    
+    def list_profiles(self, limit: int = 50) -> List[dict]:
+        """
+        최근 프로파일 목록 조회
+        
+        Args:
+            limit: 최대 조회 개수
+        
+        Returns:
+            프로파일 정보 리스트 (최신 순)
+        """
+        profiles = []
+        for name in self._profile_files()[:limit]:
+            try:
+                created, method, path, elapsed = name[:-len('.prof')].split('_', 3)
+                profiles.append({
+                    "name": name,
+                    "created": datetime.strptime(created, '%Y%m%dT%H%M%S%f').isoformat(),
+                    "method": method,
+                    "path": path,
+                    "elapsed_ms": int(elapsed.rstrip('ms'))
+                })
+            except ValueError:
+                continue  # 이 프로파일러가 만들지 않은 파일
+        return profiles
+    
+    def render_profile(self, name: str, sort: str = 'cumulative', limit: int = 40) -> Optional[str]:
+        """
+        프로파일 파일을 텍스트 요약으로 변환
+        
+        Args:
+            name: 프로파일 파일 이름
+            sort: 정렬 기준 (cumulative, tottime, calls 등)
+            limit: 출력할 함수 개수
+        
+        Returns:
+            pstats 텍스트 요약. 파일이 없으면 None
+        """
+        if name not in self._profile_files():
+            return None
+        if sort not in SORT_KEYS:
+            sort = 'cumulative'
+        output = io.StringIO()
+        stats = pstats.Stats(os.path.join(self.directory, name), stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+class StartupTimer:
+    """
+    서버 시작 단계별 소요 시간 기록
+    
+    mark()를 부를 때마다 직전 mark() 이후 걸린 시간을 단계 이름과 함께 저장합니다.
+    """
+    
+    def __init__(self, started: Optional[float] = None):
+        """
+        측정 시작
+        
+        Args:
+            started: 시작 시각 (time.perf_counter() 값, 없으면 지금)
+        """
+        self.started = started if started is not None else time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.started
+    
+    def mark(self, name: str):
+        """
+        단계 하나가 끝났음을 기록
+        
+        Args:
+            name: 단계 이름
+        """
+        now = time.perf_counter()
+        self.phases.append((name, (now - self._last) * 1000))
+        self._last = now
+    
+    def report(self) -> dict:
+        """
+        단계별 소요 시간 조회
+        
+        Returns:
+            단계 목록(ms)과 시작부터 마지막 단계까지의 전체 시간(ms)이 담긴 딕셔너리
+        """
+        return {
+            "phases": [{"name": name, "ms": round(ms, 1)} for name, ms in self.phases],
+            "total_ms": round((self._last - self.started) * 1000, 1)
+        }
+    
+    def summary(self) -> str:
+        """한 줄 요약 (로그 출력용)"""
+        phases = ", ".join(f"{name} {ms:.0f}ms" for name, ms in self.phases)
+        return f"시작 시간: {phases} (합계 {(self._last - self.started) * 1000:.0f}ms)"
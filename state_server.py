@@ -0,0 +1,549 @@
+"""
+상태 서버 모듈
+
+WashingMachineSystem을 독립 프로세스로 실행하여 하나의 권위 있는 상태 소유자로 두고,
+여러 개의 상태 없는(stateless) 웹 프로세스가 TCP 또는 Unix 소켓으로 접근하게 합니다.
+
+프로토콜 (요청/응답 모두 같은 프레임 형식):
+    [4바이트 길이 (big-endian)] [공백 없이 직렬화한 JSON 배열]
+    요청: [요청ID, 메서드 이름, [인자...]]
+    응답: [요청ID, 성공 여부(1/0), 결과 또는 오류 메시지]
+
+인증: 서버에 공유 토큰(STATE_SERVER_TOKEN)이 설정되어 있으면 연결의 첫 프레임이
+[요청ID, "__auth__", [토큰]] 이어야 하며, 토큰이 다르거나 다른 요청이 먼저 오면 연결을 닫습니다.
+
+한 연결에서 응답을 기다리지 않고 여러 요청을 연달아 보낼 수 있으며(파이프라이닝),
+서버는 연결별로 요청 순서대로 응답합니다.
+
+실행 예:
+    python state_server.py --bind 127.0.0.1:7070
+    python state_server.py --bind unix:/tmp/washing.sock
+"""
+
+import hmac
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+from models import MachineType, parse_fleet
+from notifier import NotificationDispatcher
+from washing_system import WashingMachineSystem
+
+# 프레임 헤더: 4바이트 부호 없는 정수 (페이로드 길이)
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# 연결 인증에 쓰는 첫 프레임의 메서드 이름
+AUTH_METHOD = '__auth__'
+
+# 원격 호출을 허용하는 WashingMachineSystem 메서드
+ALLOWED_METHODS = {
+    'get_status',
+    'get_dashboard',
+    'start_washing',
+    'complete_washing',
+    'check_and_update_status',
+    'get_notifications',
+    'clear_notifications',
+    'cancel_reservation',
+    'get_state_at',
+    'apply_telemetry',
+    'store_telemetry',
+    'get_idempotency_key',
+    'claim_idempotency_key',
+    'save_idempotency_key',
+    'release_idempotency_key',
+    'delete_idempotency_keys',
+}
+
+# 인자 중 ISO 8601 문자열로 전달되는 시간의 위치 (datetime으로 되돌림)
+DATETIME_ARGS = {
+    'get_state_at': (0,),
+    'apply_telemetry': (1,),
+    'claim_idempotency_key': (2, 3),
+    'save_idempotency_key': (4,),
+    'delete_idempotency_keys': (0,),
+}
+
+
+class StateServerError(RuntimeError):
+    """상태 서버가 오류 응답을 반환했을 때 발생하는 예외"""
+
+
+def parse_address(address: str) -> Union[Tuple[str, int], str]:
+    """
+    주소 문자열 해석
+    
+    Args:
+        address: "host:port" 또는 "unix:/경로" 형식의 주소
+    
+    Returns:
+        TCP는 (host, port) 튜플, Unix 소켓은 파일 경로 문자열
+    """
+    if address.startswith('unix:'):
+        return address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+def _encode(message) -> bytes:
+    """메시지를 프레임으로 인코딩"""
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+def _read_exact(stream, size: int) -> Optional[bytes]:
+    """
+    스트림에서 정확히 size 바이트 읽기
+    
+    Returns:
+        읽은 바이트. 연결이 닫혔으면 None
+    """
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _read_frame(stream):
+    """
+    스트림에서 프레임 하나를 읽어 디코딩
+    
+    Returns:
+        디코딩된 메시지. 연결이 닫혔으면 None
+    """
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise StateServerError(f"프레임이 너무 큽니다: {length} bytes")
+    payload = _read_exact(stream, length)
+    if payload is None:
+        return None
+    return json.loads(payload.decode('utf-8'))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """연결 하나를 처리하는 핸들러 (요청 순서대로 응답)"""
+    
+    def setup(self):
+        super().setup()
+        if self.connection.family != getattr(socket, 'AF_UNIX', None):
+            # 작은 응답 프레임이 Nagle 알고리즘으로 지연되지 않도록 설정
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def handle(self):
+        authenticated = self.server.token is None
+        while True:
+            try:
+                request = _read_frame(self.rfile)
+                request_id, method, args = request
+            except (TypeError, ValueError, StateServerError):
+                break
+            
+            if method == AUTH_METHOD:
+                authenticated = self.server.check_token(args)
+                self.wfile.write(_encode([request_id, int(authenticated),
+                                          None if authenticated else "인증에 실패했습니다."]))
+                if not authenticated:
+                    break
+                continue
+            if not authenticated:
+                self.wfile.write(_encode([request_id, 0, "인증이 필요합니다."]))
+                break
+            
+            try:
+                result = self.server.dispatch(method, args)
+                response = [request_id, 1, result]
+            except Exception as e:
+                response = [request_id, 0, f"{type(e).__name__}: {e}"]
+            
+            self.wfile.write(_encode(response))
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class _ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class StateServer:
+    """
+    WashingMachineSystem을 소켓으로 제공하는 상태 서버
+    
+    연결마다 스레드 하나가 요청을 처리합니다. 상태 변경은 WashingMachineSystem이 자체 잠금과
+    트랜잭션(transactional)으로 직렬화하므로 서버 전체 잠금은 두지 않습니다.
+    조회나 과거 상태 재구성(get_state_at)처럼 오래 걸리는 요청이 다른 웹 프로세스의 요청을 막지 않습니다.
+    """
+    
+    def __init__(self, system: WashingMachineSystem, address: Union[Tuple[str, int], str],
+                 check_interval: Optional[float] = 10, token: Optional[str] = None):
+        """
+        상태 서버 초기화
+        
+        Args:
+            system: 상태를 소유할 WashingMachineSystem 인스턴스
+            address: (host, port) 튜플 또는 Unix 소켓 경로
+            check_interval: 완료 확인 주기(초). None이면 백그라운드 확인을 하지 않음
+            token: 클라이언트가 첫 프레임으로 보내야 하는 공유 토큰 (None이면 인증하지 않음)
+        """
+        self.system = system
+        self.check_interval = check_interval
+        self.token = token or None
+        self._stopped = threading.Event()
+        
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            self._server = _ThreadingUnixServer(address, _RequestHandler)
+        else:
+            self._server = _ThreadingTCPServer(address, _RequestHandler)
+        self._server.dispatch = self.dispatch
+        self._server.token = self.token
+        self._server.check_token = self.check_token
+    
+    @property
+    def address(self) -> Union[Tuple[str, int], str]:
+        """실제로 바인딩된 주소 (포트 0으로 열었을 때 확인용)"""
+        return self._server.server_address
+    
+    def check_token(self, args) -> bool:
+        """
+        인증 프레임의 토큰 확인
+        
+        Args:
+            args: 인증 프레임의 인자 리스트 ([토큰])
+        
+        Returns:
+            토큰 일치 여부 (서버에 토큰이 없으면 항상 True)
+        """
+        if self.token is None:
+            return True
+        if not isinstance(args, list) or len(args) != 1 or not isinstance(args[0], str):
+            return False
+        return hmac.compare_digest(args[0].encode('utf-8'), self.token.encode('utf-8'))
+    
+    def dispatch(self, method: str, args: List):
+        """
+        요청 하나를 WashingMachineSystem 메서드 호출로 처리
+        
+        Args:
+            method: 메서드 이름
+            args: 위치 인자 리스트
+        
+        Returns:
+            메서드 반환값 (JSON 직렬화 가능)
+        """
+        if method not in ALLOWED_METHODS:
+            raise StateServerError(f"허용되지 않은 메서드입니다: {method}")
+        if method in DATETIME_ARGS:
+            args = [
+                datetime.fromisoformat(arg) if index in DATETIME_ARGS[method] else arg
+                for index, arg in enumerate(args)
+            ]
+        return getattr(self.system, method)(*args)
+    
+    def _status_checker(self):
+        """주기적으로 세탁 완료 여부 확인 (시작 직후 멈춰 있던 동안 밀린 처리를 먼저 한 번에)"""
+        try:
+            self.system.catch_up()
+        except Exception as e:
+            print(f"밀린 상태 처리 중 오류 발생: {e}")
+        while not self._stopped.wait(self.check_interval):
+            try:
+                self.dispatch('check_and_update_status', [])
+            except Exception as e:
+                print(f"상태 확인 중 오류 발생: {e}")
+    
+    def serve_forever(self):
+        """현재 스레드에서 서버 실행 (종료될 때까지 반환하지 않음)"""
+        if self.check_interval:
+            threading.Thread(target=self._status_checker, daemon=True).start()
+        self._server.serve_forever()
+    
+    def start(self) -> 'StateServer':
+        """백그라운드 스레드에서 서버 실행"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        """서버 종료"""
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+    
+    @classmethod
+    def loopback(cls, system: WashingMachineSystem, token: Optional[str] = None) -> 'StateServer':
+        """
+        테스트용 루프백 서버 생성 및 시작 (127.0.0.1의 임의 포트)
+        
+        Args:
+            system: 상태를 소유할 WashingMachineSystem 인스턴스
+            token: 공유 토큰 (None이면 인증하지 않음)
+        
+        Returns:
+            실행 중인 StateServer
+        """
+        return cls(system, ('127.0.0.1', 0), check_interval=None, token=token).start()
+
+
+class _Connection:
+    """상태 서버 연결 하나 (소켓, 읽기 스트림, 다음 요청 ID)"""
+    
+    def __init__(self, sock: socket.socket):
+        """
+        연결 초기화
+        
+        Args:
+            sock: 연결된 소켓
+        """
+        self.sock = sock
+        self.rfile = sock.makefile('rb')
+        self.next_id = 0
+    
+    def close(self):
+        """연결 닫기"""
+        try:
+            self.rfile.close()
+        finally:
+            self.sock.close()
+
+
+class StateClient:
+    """
+    상태 서버 클라이언트
+    
+    WashingMachineSystem과 같은 메서드를 제공하므로 웹 계층에서 그대로 바꿔 쓸 수 있습니다.
+    연결은 모든 스레드가 함께 쓰는 작은 풀에 보관했다가 다시 사용하므로,
+    요청마다 새 스레드를 쓰는 웹 서버에서도 요청마다 새로 연결하고 인증하지 않습니다.
+    """
+    
+    def __init__(self, address: Union[Tuple[str, int], str], timeout: float = 10.0,
+                 token: Optional[str] = None, pool_size: int = 8):
+        """
+        클라이언트 초기화
+        
+        Args:
+            address: (host, port) 튜플 또는 Unix 소켓 경로
+            timeout: 소켓 타임아웃(초)
+            token: 서버와 공유하는 토큰 (None이면 인증 프레임을 보내지 않음)
+            pool_size: 다시 쓰기 위해 보관할 유휴 연결의 최대 개수
+        """
+        self.address = address
+        self.timeout = timeout
+        self.token = token or None
+        self.pool_size = pool_size
+        self._idle: List[_Connection] = []
+        self._pool_lock = threading.Lock()
+    
+    def _connect(self) -> _Connection:
+        """새 연결 만들기 (토큰이 있으면 인증까지)"""
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        conn = _Connection(sock)
+        if self.token is not None:
+            self._authenticate(conn)
+        return conn
+    
+    def _authenticate(self, conn: _Connection):
+        """새 연결의 첫 프레임으로 공유 토큰 전송 (실패하면 연결을 닫고 예외 발생)"""
+        try:
+            conn.sock.sendall(_encode([-1, AUTH_METHOD, [self.token]]))
+            response = _read_frame(conn.rfile)
+        except (OSError, ValueError):
+            conn.close()
+            raise
+        if response is None or not response[1]:
+            conn.close()
+            raise StateServerError(response[2] if response else "상태 서버 연결이 끊어졌습니다.")
+    
+    def _acquire(self) -> _Connection:
+        """풀에서 유휴 연결을 꺼내거나 새로 연결"""
+        with self._pool_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+    
+    def _release(self, conn: _Connection):
+        """다 쓴 연결을 풀에 돌려놓음 (풀이 가득 차면 닫음)"""
+        with self._pool_lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+    
+    def call_many(self, calls: List[Tuple[str, list]]) -> List:
+        """
+        여러 요청을 한 번에 보내고 응답을 모아 받기 (파이프라이닝)
+        
+        Args:
+            calls: (메서드 이름, 인자 리스트) 튜플의 리스트
+        
+        Returns:
+            요청 순서대로 정렬된 결과 리스트
+        """
+        conn = self._acquire()
+        first_id = conn.next_id
+        conn.next_id += len(calls)
+        frames = b''.join(
+            _encode([first_id + i, method, list(args)])
+            for i, (method, args) in enumerate(calls)
+        )
+        
+        try:
+            conn.sock.sendall(frames)
+            responses = [_read_frame(conn.rfile) for _ in calls]
+        except (OSError, ValueError):
+            conn.close()
+            raise
+        
+        # 연결 상태가 확실하지 않으면 풀에 돌려놓지 않고 닫음
+        for i, response in enumerate(responses):
+            if response is None:
+                conn.close()
+                raise StateServerError("상태 서버 연결이 끊어졌습니다.")
+            if response[0] != first_id + i:
+                conn.close()
+                raise StateServerError("응답 순서가 올바르지 않습니다.")
+        self._release(conn)
+        
+        results = []
+        for request_id, ok, result in responses:
+            if not ok:
+                raise StateServerError(result)
+            results.append(result)
+        return results
+    
+    def _call(self, method: str, *args):
+        """요청 하나를 보내고 결과 반환"""
+        return self.call_many([(method, list(args))])[0]
+    
+    def get_status(self) -> dict:
+        """전체 시스템 상태 조회"""
+        return self._call('get_status')
+    
+    def get_dashboard(self, user_name: Optional[str] = None) -> dict:
+        """대시보드 정보 한 번에 조회"""
+        return self._call('get_dashboard', user_name)
+    
+    def start_washing(self, user_name: str, duration_minutes: Optional[int] = None,
+                      machine_type: str = MachineType.WASHER.value, load_kg: int = 0,
+                      then_dry: bool = False) -> dict:
+        """세탁 시작 (또는 대기 예약)"""
+        return self._call('start_washing', user_name, duration_minutes, machine_type, load_kg, then_dry)
+    
+    def complete_washing(self, machine_id: int, user_name: str) -> dict:
+        """세탁 완료 처리 및 옷 가져가기"""
+        return self._call('complete_washing', machine_id, user_name)
+    
+    def check_and_update_status(self):
+        """세탁 완료 여부 확인"""
+        return self._call('check_and_update_status')
+    
+    def get_notifications(self, user_name: str) -> List[dict]:
+        """사용자 알림 조회"""
+        return self._call('get_notifications', user_name)
+    
+    def clear_notifications(self, user_name: str):
+        """사용자 알림 삭제"""
+        return self._call('clear_notifications', user_name)
+    
+    def cancel_reservation(self, user_name: str) -> dict:
+        """예약 취소"""
+        return self._call('cancel_reservation', user_name)
+    
+    def get_state_at(self, when: datetime) -> dict:
+        """과거 특정 시점의 시스템 상태 재구성"""
+        return self._call('get_state_at', when.isoformat())
+    
+    def apply_telemetry(self, machine_id: int, end_time: datetime) -> bool:
+        """세탁기 보고값으로 종료 시간 보정"""
+        return self._call('apply_telemetry', machine_id, end_time.isoformat())
+    
+    def store_telemetry(self, buckets: List[tuple]):
+        """다운샘플링된 텔레메트리 저장"""
+        return self._call('store_telemetry', [list(bucket) for bucket in buckets])
+    
+    def get_idempotency_key(self, key: str) -> Optional[dict]:
+        """멱등성 키로 저장된 응답 조회"""
+        return self._call('get_idempotency_key', key)
+    
+    def claim_idempotency_key(self, key: str, fingerprint: str, created_at: datetime,
+                              stale_before: datetime) -> bool:
+        """멱등성 키를 처리 중으로 선점"""
+        return self._call('claim_idempotency_key', key, fingerprint, created_at.isoformat(),
+                          stale_before.isoformat())
+    
+    def save_idempotency_key(self, key: str, fingerprint: str, status: int, response: str,
+                             created_at: datetime):
+        """멱등성 키와 응답 저장"""
+        return self._call('save_idempotency_key', key, fingerprint, status, response, created_at.isoformat())
+    
+    def release_idempotency_key(self, key: str):
+        """멱등성 키의 처리 중 표시 삭제"""
+        return self._call('release_idempotency_key', key)
+    
+    def delete_idempotency_keys(self, before: datetime) -> int:
+        """오래된 멱등성 키 삭제"""
+        return self._call('delete_idempotency_keys', before.isoformat())
+    
+    def close(self):
+        """풀에 보관 중인 연결을 모두 닫음"""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="세탁기 시스템 상태 서버")
+    parser.add_argument('--bind', default=os.environ.get('STATE_SERVER_BIND', '127.0.0.1:7070'),
+                        help='"host:port" 또는 "unix:/경로"')
+    parser.add_argument('--machines', type=int, default=3, help='세탁기 개수')
+    parser.add_argument('--db', default='washing_machine.db', help='데이터베이스 파일 경로')
+    parser.add_argument('--fleet', default=os.environ.get('MACHINE_FLEET', ''),
+                        help='기기 구성 (예: "washer:8,washer:12,dryer:10", 주어지면 --machines 무시)')
+    parser.add_argument('--token', default=os.environ.get('STATE_SERVER_TOKEN', ''),
+                        help='클라이언트가 첫 프레임으로 보내야 하는 공유 토큰 (기본값: STATE_SERVER_TOKEN)')
+    options = parser.parse_args()
+    
+    system = WashingMachineSystem(num_machines=options.machines, db_path=options.db,
+                                  fleet=parse_fleet(options.fleet) or None)
+    notifier = NotificationDispatcher.from_env(system.db)
+    if notifier.enabled:
+        system.notifier = notifier.start()
+    server = StateServer(system, parse_address(options.bind), token=options.token)
+    print(f"상태 서버가 시작되었습니다: {options.bind}")
+    if server.token is None:
+        print("경고: STATE_SERVER_TOKEN이 없어 접속하는 누구나 상태를 변경할 수 있습니다.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+        notifier.stop()
@@ -0,0 +1,347 @@
+"""
+동시성 스트레스 테스트 도구
+
+여러 스레드(선택적으로 여러 프로세스)에서 WashingMachineSystem을 직접 호출하여
+세탁 시작/완료/예약 취소/상태 조회를 동시에 실행하고, 끝난 뒤 불변 조건을 검사합니다.
+
+검사하는 불변 조건:
+    1. 세탁기 중복 배정 없음 (옷을 가져가기 전에 같은 세탁기에서 세탁이 다시 시작되지 않음)
+    2. 대기열 FIFO 순서 유지 (자동 할당은 항상 가장 먼저 예약한 사람에게)
+    3. 세탁 한 번당 완료 알림은 정확히 한 개
+    4. 이벤트 저널 재생 결과와 데이터베이스 상태가 일치
+
+스레드 수별 처리량(초당 작업 수)과 잠금 대기 시간을 표로 출력하고,
+matplotlib가 설치되어 있으면 그래프 이미지도 저장합니다.
+
+실행 예:
+    python stress_test.py --threads 1 2 4 8 16 --duration 5
+    python stress_test.py --threads 4 --processes 4 --duration 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from models import MachineType
+from washing_system import WashingMachineSystem
+
+# 완료 알림 메시지에 포함되는 문구 (check_and_update_status 참고)
+COMPLETION_TEXT = "세탁이 완료되었습니다"
+
+# 테스트용 세탁 시간 (분). 실행 중에 세탁이 끝나도록 아주 짧게 설정
+CYCLE_MINUTES = 0.003
+
+
+class TimedLock:
+    """
+    잠금 대기 시간을 측정하는 RLock 래퍼
+    
+    WashingMachineSystem의 내부 잠금을 이 객체로 바꿔 끼워 측정합니다.
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self.wait_seconds = 0.0
+        self.acquisitions = 0
+    
+    def __enter__(self):
+        started = time.perf_counter()
+        self._lock.acquire()
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self.wait_seconds += waited
+            self.acquisitions += 1
+        return self
+    
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def _worker(system: WashingMachineSystem, worker_id: int, deadline: float,
+            counts: Counter, errors: List[str], seed: int):
+    """
+    작업 스레드: 마감 시간까지 무작위 작업을 반복 실행
+    
+    Args:
+        system: 테스트 대상 시스템
+        worker_id: 작업자 번호 (사용자 이름 생성용)
+        deadline: 종료 시각 (time.perf_counter 기준)
+        counts: 작업 종류별 실행 횟수 (공유)
+        errors: 예외 메시지 목록 (공유)
+        seed: 난수 시드
+    """
+    rng = random.Random(seed)
+    users = [f"w{worker_id}-u{k}" for k in range(3)]
+    local = Counter()
+    
+    while time.perf_counter() < deadline:
+        user = rng.choice(users)
+        op = rng.choices(['start', 'complete', 'cancel', 'status', 'check'], weights=[4, 3, 1, 3, 1])[0]
+        try:
+            if op == 'start':
+                system.start_washing(user, CYCLE_MINUTES)
+            elif op == 'complete':
+                for machine in system.get_status()['machines']:
+                    if machine['user_name'] in users and machine['status'] == '완료':
+                        system.complete_washing(machine['machine_id'], machine['user_name'])
+                        break
+            elif op == 'cancel':
+                system.cancel_reservation(user)
+            elif op == 'status':
+                system.get_status()
+            else:
+                system.check_and_update_status()
+            local[op] += 1
+        except Exception as e:
+            errors.append(f"{op}: {type(e).__name__}: {e}")
+    
+    counts.update(local)
+
+
+def run_threads(db_path: str, num_threads: int, duration: float, num_machines: int,
+                seed: int = 0) -> Dict:
+    """
+    한 프로세스 안에서 여러 스레드로 부하 실행
+    
+    Args:
+        db_path: 데이터베이스 파일 경로
+        num_threads: 스레드 수
+        duration: 실행 시간(초)
+        num_machines: 세탁기 수
+        seed: 난수 시드
+    
+    Returns:
+        작업 수, 오류, 잠금 대기 통계가 담긴 딕셔너리
+    """
+    system = WashingMachineSystem(num_machines=num_machines, db_path=db_path)
+    # 대기자 자동 시작(complete_washing)도 짧은 세탁 시간을 쓰도록 기본값을 바꿈
+    system.durations = {machine_type: CYCLE_MINUTES for machine_type in MachineType}
+    lock = TimedLock()
+    system._lock = lock
+    
+    counts: Counter = Counter()
+    errors: List[str] = []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(system, i, deadline, counts, errors, seed * 1000 + i))
+        for i in range(num_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # 남은 세탁이 모두 완료 처리되도록 마무리
+    time.sleep(CYCLE_MINUTES * 60)
+    system.check_and_update_status()
+    
+    return {
+        "ops": sum(counts.values()),
+        "counts": dict(counts),
+        "errors": errors,
+        "lock_wait_seconds": lock.wait_seconds,
+        "lock_acquisitions": lock.acquisitions
+    }
+
+
+def _process_main(args):
+    """프로세스 모드의 진입점 (multiprocessing용)"""
+    db_path, num_threads, duration, num_machines, seed = args
+    return run_threads(db_path, num_threads, duration, num_machines, seed)
+
+
+def check_invariants(db_path: str, num_machines: int) -> List[str]:
+    """
+    이벤트 저널과 데이터베이스로 불변 조건 검사
+    
+    Args:
+        db_path: 데이터베이스 파일 경로
+        num_machines: 세탁기 수
+    
+    Returns:
+        위반 내용 목록 (비어 있으면 통과)
+    """
+    violations = []
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    events = conn.execute("SELECT * FROM events ORDER BY seq").fetchall()
+    
+    holder: Dict[int, str] = {}           # 세탁기 → 현재 사용자 (옷을 가져가기 전까지)
+    completed: Dict[int, bool] = {}       # 세탁기 → 현재 세탁 완료 여부
+    completions = Counter()               # 세탁기별 WashCompleted 횟수
+    queue: List[tuple] = []               # 대기 중인 (예약 ID, 사용자) (예약 순서)
+    
+    for event in events:
+        kind = event['event_type']
+        payload = json.loads(event['payload'])
+        seq = event['seq']
+        
+        if kind == 'WashStarted':
+            machine_id = payload['machine_id']
+            if machine_id in holder:
+                violations.append(
+                    f"[중복 배정] seq {seq}: 세탁기 {machine_id}번을 {holder[machine_id]}이(가) 쓰는 중인데 "
+                    f"{payload['user_name']}에게 배정됨"
+                )
+            holder[machine_id] = payload['user_name']
+            completed[machine_id] = False
+            reservation_id = payload.get('reservation_id')
+            if reservation_id is not None:
+                if not queue or queue[0][0] != reservation_id:
+                    violations.append(
+                        f"[FIFO 위반] seq {seq}: 예약 {reservation_id}번이 할당되었지만 가장 오래된 예약은 "
+                        f"{queue[0][0] if queue else '없음'}"
+                    )
+                queue = [r for r in queue if r[0] != reservation_id]
+        elif kind == 'WashCompleted':
+            machine_id = payload['machine_id']
+            if completed.get(machine_id):
+                violations.append(f"[중복 완료] seq {seq}: 세탁기 {machine_id}번이 두 번 완료 처리됨")
+            completed[machine_id] = True
+            completions[machine_id] += 1
+        elif kind == 'Collected':
+            holder.pop(payload['machine_id'], None)
+            completed.pop(payload['machine_id'], None)
+        elif kind == 'Reserved':
+            queue.append((payload['reservation_id'], payload['user_name']))
+        elif kind == 'ReservationExpired':
+            expired = set(payload['reservation_ids'])
+            queue = [r for r in queue if r[0] not in expired]
+        elif kind == 'ReservationCancelled':
+            queue = [r for r in queue if r[1] != payload['user_name']]
+    
+    # 완료 알림은 세탁 완료 한 번당 정확히 하나
+    notified = Counter()
+    for row in conn.execute("SELECT message FROM notifications WHERE message LIKE ?", (f"%{COMPLETION_TEXT}%",)):
+        notified[int(row['message'].split('세탁기 ')[1].split('번')[0])] += 1
+    for machine_id in range(1, num_machines + 1):
+        if notified[machine_id] != completions[machine_id]:
+            violations.append(
+                f"[완료 알림] 세탁기 {machine_id}번: 완료 {completions[machine_id]}회, 알림 {notified[machine_id]}개"
+            )
+    conn.close()
+    
+    # 저널 재생 결과와 데이터베이스 상태 비교
+    system = WashingMachineSystem(num_machines=num_machines, db_path=db_path)
+    replayed = system.journal.state.to_dict()
+    actual = {"machines": system.db.get_machines(), "reservations": system.db.get_reservations()}
+    if replayed != actual:
+        violations.append("[저널 불일치] 이벤트 재생 결과와 데이터베이스 상태가 다름")
+    system.db.close()
+    
+    return violations
+
+
+def run_case(num_threads: int, num_processes: int, duration: float, num_machines: int) -> Dict:
+    """
+    스레드 수 × 프로세스 수 조합 하나를 새 데이터베이스에서 실행하고 검사
+    
+    Returns:
+        처리량, 잠금 대기, 오류, 불변 조건 위반이 담긴 결과 딕셔너리
+    """
+    workdir = tempfile.mkdtemp(prefix='washing-stress-')
+    db_path = os.path.join(workdir, 'stress.db')
+    try:
+        # 스키마와 세탁기를 먼저 만들어 두어 프로세스 간 초기화 경쟁을 피함
+        WashingMachineSystem(num_machines=num_machines, db_path=db_path).db.close()
+        
+        started = time.perf_counter()
+        if num_processes > 1:
+            with multiprocessing.Pool(num_processes) as pool:
+                results = pool.map(_process_main, [
+                    (db_path, num_threads, duration, num_machines, p) for p in range(num_processes)
+                ])
+        else:
+            results = [run_threads(db_path, num_threads, duration, num_machines)]
+        elapsed = time.perf_counter() - started
+        
+        ops = sum(r['ops'] for r in results)
+        lock_wait = sum(r['lock_wait_seconds'] for r in results)
+        acquisitions = sum(r['lock_acquisitions'] for r in results)
+        errors = [e for r in results for e in r['errors']]
+        return {
+            "threads": num_threads,
+            "processes": num_processes,
+            "ops": ops,
+            "throughput": ops / elapsed,
+            "lock_wait_ms": lock_wait / acquisitions * 1000 if acquisitions else 0.0,
+            "lock_wait_share": lock_wait / (elapsed * num_threads * num_processes),
+            "errors": errors,
+            "violations": check_invariants(db_path, num_machines)
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def plot(results: List[Dict], output: str) -> bool:
+    """
+    처리량/잠금 대기 그래프 저장 (matplotlib가 없으면 건너뜀)
+    
+    Returns:
+        저장 여부
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+    
+    workers = [r['threads'] * r['processes'] for r in results]
+    fig, ax1 = plt.subplots(figsize=(7, 4))
+    ax1.plot(workers, [r['throughput'] for r in results], 'o-', color='tab:blue')
+    ax1.set_xlabel('workers (threads x processes)')
+    ax1.set_ylabel('throughput (ops/s)', color='tab:blue')
+    ax2 = ax1.twinx()
+    ax2.plot(workers, [r['lock_wait_ms'] for r in results], 's--', color='tab:red')
+    ax2.set_ylabel('avg lock wait (ms)', color='tab:red')
+    fig.tight_layout()
+    fig.savefig(output)
+    return True
+
+
+def print_report(results: List[Dict]):
+    """결과 표와 간단한 막대 그래프 출력"""
+    best = max(r['throughput'] for r in results) or 1
+    print(f"{'스레드':>6} {'프로세스':>8} {'작업 수':>8} {'처리량(ops/s)':>14} {'평균 잠금 대기(ms)':>18} {'대기 비율':>8}  {'오류':>4} {'위반':>4}")
+    for r in results:
+        bar = '#' * int(30 * r['throughput'] / best)
+        print(f"{r['threads']:>6} {r['processes']:>8} {r['ops']:>8} {r['throughput']:>14.1f} "
+              f"{r['lock_wait_ms']:>18.3f} {r['lock_wait_share']:>8.1%}  {len(r['errors']):>4} "
+              f"{len(r['violations']):>4}  {bar}")
+    
+    for r in results:
+        for message in r['violations'][:10] + r['errors'][:5]:
+            print(f"  - ({r['threads']}x{r['processes']}) {message}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="세탁기 시스템 동시성 스트레스 테스트")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='테스트할 스레드 수 목록')
+    parser.add_argument('--processes', type=int, default=1, help='프로세스 수 (기본 1)')
+    parser.add_argument('--duration', type=float, default=5, help='경우마다 실행 시간(초)')
+    parser.add_argument('--machines', type=int, default=3, help='세탁기 개수')
+    parser.add_argument('--plot', default='stress_result.png', help='그래프 저장 경로')
+    options = parser.parse_args()
+    
+    results = [
+        run_case(num_threads, options.processes, options.duration, options.machines)
+        for num_threads in options.threads
+    ]
+    print_report(results)
+    if plot(results, options.plot):
+        print(f"그래프 저장: {options.plot}")
+    
+    if any(r['violations'] for r in results):
+        raise SystemExit(1)
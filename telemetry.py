@@ -0,0 +1,294 @@
+"""
+세탁기 텔레메트리 수집 모듈
+
+세탁기가 보고하는 진행률/하트비트를 세탁기별 고정 크기 링 버퍼에 저장합니다(메모리 사용량 고정).
+수집 경로는 메모리에만 쓰고, 백그라운드 스레드가 주기적으로
+오래된 데이터를 1분 단위로 다운샘플링하여 데이터베이스에 한 번에 저장하고
+실제 보고값으로 세탁기 종료 시간을 보정합니다.
+링 버퍼는 실제로 있는 세탁기 번호에 대해서만 만들므로 전체 메모리 사용량도 고정됩니다.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# 링 버퍼에 저장되는 보고값: (타임스탬프(epoch 초), 진행률(0~100), 남은 시간(초))
+Reading = Tuple[float, Optional[float], Optional[int]]
+
+# 받아들이는 측정 시간 범위 (현재 시간 기준, 초): 이보다 오래되었거나 미래인 보고값은 버림
+MAX_READING_AGE_SECONDS = 24 * 3600
+MAX_CLOCK_SKEW_SECONDS = 300
+
+# 남은 시간 보고값과 종료 시간 추정값의 상한 (초)
+MAX_REMAINING_SECONDS = 24 * 3600
+
+
+class RingBuffer:
+    """
+    고정 크기 링 버퍼
+    
+    가득 차면 가장 오래된 항목을 덮어씁니다.
+    지금까지 기록된 전체 개수(total)로 "어디까지 읽었는지"를 추적할 수 있습니다.
+    """
+    
+    def __init__(self, capacity: int):
+        """
+        링 버퍼 초기화
+        
+        Args:
+            capacity: 최대 보관 개수
+        """
+        self.capacity = capacity
+        self.slots: List[Optional[Reading]] = [None] * capacity
+        self.total = 0  # 지금까지 기록된 전체 개수
+    
+    def append(self, item: Reading):
+        """항목 추가 (O(1))"""
+        self.slots[self.total % self.capacity] = item
+        self.total += 1
+    
+    def since(self, position: int) -> Tuple[List[Reading], int]:
+        """
+        position 이후에 기록된 항목 조회
+        
+        Args:
+            position: 이전에 읽었던 total 값
+        
+        Returns:
+            (항목 리스트, 이미 덮어써져 읽지 못한 개수)
+        """
+        oldest = max(0, self.total - self.capacity)
+        start = max(position, oldest)
+        items = [self.slots[i % self.capacity] for i in range(start, self.total)]
+        return items, start - position
+    
+    def latest(self, limit: int) -> List[Reading]:
+        """최근 항목 최대 limit개 조회 (오래된 순)"""
+        items, _ = self.since(max(0, self.total - limit))
+        return items
+
+
+class TelemetryStore:
+    """
+    텔레메트리 수집 및 다운샘플링 관리 클래스
+    
+    ingest()는 잠금 하나와 링 버퍼 쓰기만 하므로 초당 수천 건을 처리할 수 있고,
+    /api/status 요청 경로나 데이터베이스에는 전혀 접근하지 않습니다.
+    """
+    
+    def __init__(self, system, capacity: int = 600, flush_interval: float = 5,
+                 bucket_seconds: int = 60, adjust_threshold_seconds: int = 30):
+        """
+        텔레메트리 저장소 초기화
+        
+        Args:
+            system: WashingMachineSystem (또는 StateClient)
+            capacity: 세탁기별 링 버퍼 크기
+            flush_interval: 다운샘플링/보정 주기(초)
+            bucket_seconds: 다운샘플링 구간 길이(초)
+            adjust_threshold_seconds: 이 값 이상 차이 날 때만 종료 시간을 보정
+        """
+        self.system = system
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.bucket_seconds = bucket_seconds
+        self.adjust_threshold_seconds = adjust_threshold_seconds
+        self.buffers: Dict[int, RingBuffer] = {}
+        self.flushed: Dict[int, int] = {}  # 세탁기별로 DB에 저장한 위치 (RingBuffer.total 기준)
+        self.dropped = 0  # 저장 전에 덮어써진 보고값 개수
+        self.machine_ids: Optional[set] = None  # 보고를 받는 세탁기 번호 (처음 수집할 때 조회)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+    
+    def ingest(self, readings: List[dict]) -> int:
+        """
+        보고값 묶음 수집
+        
+        Args:
+            readings: 보고값 리스트. 각 항목은
+                - machine_id: 세탁기 번호 (필수)
+                - progress: 진행률 0~100 (선택)
+                - remaining_seconds: 남은 시간(초) (선택)
+                - timestamp: 측정 시간, epoch 초 (선택, 기본 현재 시간)
+                progress와 remaining_seconds가 모두 없으면 하트비트로 취급합니다.
+        
+        Returns:
+            수집된 보고값 개수 (형식이 잘못되었거나, 없는 세탁기 번호이거나,
+            측정 시간이 허용 범위를 벗어난 항목은 건너뜀)
+        """
+        now = time.time()
+        machine_ids = self._known_machine_ids()
+        parsed = []
+        for reading in readings:
+            try:
+                machine_id = int(reading['machine_id'])
+                timestamp = float(reading.get('timestamp') or now)
+                progress = reading.get('progress')
+                progress = float(progress) if progress is not None else None
+                remaining = reading.get('remaining_seconds')
+                remaining = int(remaining) if remaining is not None else None
+            except (KeyError, TypeError, ValueError, AttributeError, OverflowError):
+                continue
+            if machine_id not in machine_ids:
+                continue
+            if not (math.isfinite(timestamp)
+                    and now - MAX_READING_AGE_SECONDS <= timestamp <= now + MAX_CLOCK_SKEW_SECONDS):
+                continue
+            if progress is not None and not math.isfinite(progress):
+                continue
+            if remaining is not None and not 0 <= remaining <= MAX_REMAINING_SECONDS:
+                continue
+            parsed.append((machine_id, (timestamp, progress, remaining)))
+        
+        with self._lock:
+            for machine_id, item in parsed:
+                buffer = self.buffers.get(machine_id)
+                if buffer is None:
+                    buffer = self.buffers[machine_id] = RingBuffer(self.capacity)
+                buffer.append(item)
+        return len(parsed)
+    
+    def _known_machine_ids(self) -> set:
+        """
+        보고를 받을 세탁기 번호 조회 (기기 구성은 시작할 때 정해지므로 한 번만 조회)
+        
+        Returns:
+            세탁기 번호 집합
+        """
+        if self.machine_ids is None:
+            self.machine_ids = {m['machine_id'] for m in self.system.get_status()['machines']}
+        return self.machine_ids
+    
+    def recent(self, machine_id: int, limit: int = 60) -> List[dict]:
+        """
+        세탁기의 최근 보고값 조회
+        
+        Args:
+            machine_id: 세탁기 번호
+            limit: 최대 조회 개수
+        
+        Returns:
+            보고값 리스트 (오래된 순)
+        """
+        with self._lock:
+            buffer = self.buffers.get(machine_id)
+            items = buffer.latest(limit) if buffer else []
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(ts).isoformat(),
+                "progress": progress,
+                "remaining_seconds": remaining
+            }
+            for ts, progress, remaining in items
+        ]
+    
+    def _estimate_end_time(self, items: List[Reading]) -> Optional[float]:
+        """
+        최근 보고값으로 세탁 종료 시각(epoch 초) 추정
+        
+        남은 시간 보고가 있으면 그대로 사용하고,
+        없으면 진행률 변화 속도로 남은 시간을 계산합니다.
+        
+        Args:
+            items: 현재 세탁이 시작된 이후의 보고값 (오래된 순)
+        
+        Returns:
+            추정 종료 시각. 추정할 수 없으면 None
+        """
+        progress_points = []
+        for ts, progress, remaining in reversed(items):
+            if remaining is not None:
+                return ts + remaining
+            if progress is not None:
+                if progress >= 100:
+                    return ts
+                progress_points.append((ts, progress))
+        
+        if len(progress_points) < 2:
+            return None
+        (last_ts, last_progress), (first_ts, first_progress) = progress_points[0], progress_points[-1]
+        if last_ts <= first_ts or last_progress <= first_progress:
+            return None
+        rate = (last_progress - first_progress) / (last_ts - first_ts)  # 초당 진행률
+        return last_ts + (100 - last_progress) / rate
+    
+    def flush(self):
+        """
+        새 보고값을 다운샘플링하여 저장하고 종료 시간을 보정
+        
+        백그라운드 스레드에서 주기적으로 호출됩니다.
+        """
+        with self._lock:
+            pending = {}
+            recent = {}
+            for machine_id, buffer in self.buffers.items():
+                items, dropped = buffer.since(self.flushed.get(machine_id, 0))
+                self.flushed[machine_id] = buffer.total
+                self.dropped += dropped
+                if items:
+                    pending[machine_id] = items
+                    recent[machine_id] = buffer.latest(10)
+        
+        if not pending:
+            return
+        
+        # 1분 단위 다운샘플링 후 한 번에 저장
+        buckets = []
+        for machine_id, items in pending.items():
+            grouped: Dict[int, List[Reading]] = {}
+            for item in items:
+                grouped.setdefault(int(item[0] // self.bucket_seconds), []).append(item)
+            for bucket, bucket_items in grouped.items():
+                progresses = [p for _, p, _ in bucket_items if p is not None]
+                remainings = [r for _, _, r in bucket_items if r is not None]
+                buckets.append((
+                    machine_id,
+                    datetime.fromtimestamp(bucket * self.bucket_seconds).isoformat(),
+                    len(bucket_items),
+                    sum(progresses) / len(progresses) if progresses else None,
+                    min(remainings) if remainings else None
+                ))
+        self.system.store_telemetry(buckets)
+        
+        # 실제 보고값으로 종료 시간 보정
+        machines = {m['machine_id']: m for m in self.system.get_status()['machines']}
+        finished = False
+        for machine_id, items in recent.items():
+            machine = machines.get(machine_id)
+            if not machine or machine['status'] != '사용 중':
+                continue
+            # 이전 사용자의 세탁 중에 받은 보고값(예: 진행률 100%)이 새 세탁을 끝내지 않도록 시작 이후 것만 사용
+            if machine['start_time']:
+                started = datetime.fromisoformat(machine['start_time']).timestamp()
+                items = [item for item in items if item[0] >= started]
+            estimated = self._estimate_end_time(items)
+            if estimated is None or estimated > time.time() + MAX_REMAINING_SECONDS:
+                continue  # 진행률이 거의 변하지 않아 추정값이 지나치게 큰 경우
+            current = datetime.fromisoformat(machine['end_time']).timestamp() if machine['end_time'] else None
+            if current is None or abs(current - estimated) >= self.adjust_threshold_seconds:
+                if self.system.apply_telemetry(machine_id, datetime.fromtimestamp(estimated)):
+                    finished = finished or estimated <= time.time()
+        
+        # 세탁기가 완료를 보고했으면 다음 확인 주기를 기다리지 않고 바로 완료 처리
+        if finished:
+            self.system.check_and_update_status()
+    
+    def _flusher(self):
+        """주기적으로 flush() 실행"""
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"텔레메트리 저장 중 오류 발생: {e}")
+    
+    def start(self) -> 'TelemetryStore':
+        """백그라운드 다운샘플링 스레드 시작"""
+        threading.Thread(target=self._flusher, daemon=True).start()
+        return self
+    
+    def stop(self):
+        """백그라운드 스레드 종료 (남은 보고값은 저장)"""
+        self._stopped.set()
+        self.flush()
@@ -5,10 +5,62 @@
 데이터베이스를 사용하여 영구 저장 및 다중 사용자 지원을 제공합니다.
 """
 
+import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional
-from models import Machine, MachineStatus, Reservation
+from typing import List, Optional, Tuple
+from models import DEFAULT_DURATIONS, Machine, MachineStatus, MachineType, Reservation, EventType
 from database import Database
+from event_store import EventStore
+from matching import MatchingEngine
+from notifier import NotificationDispatcher
+
+# 기기 종류별 완료 알림 메시지 형식
+COMPLETION_MESSAGES = {
+    MachineType.WASHER.value: "세탁기 {machine_id}번 세탁이 완료되었습니다! 옷을 가져가주세요.",
+    MachineType.DRYER.value: "건조기 {machine_id}번 건조가 완료되었습니다! 옷을 가져가주세요.",
+}
+
+# 대기자에게 기기를 넘겨줄 때의 알림 메시지 형식
+HANDOVER_MESSAGES = {
+    MachineType.WASHER: "세탁기 {machine_id}번이 사용 가능합니다! 세탁이 자동으로 시작되었습니다.",
+    MachineType.DRYER: "건조기 {machine_id}번이 사용 가능합니다! 건조가 자동으로 시작되었습니다.",
+}
+
+# 대기 예약 만료 시간 (예약 후 이 시간 안에 기기가 넘어오지 않으면 취소)
+RESERVATION_EXPIRY = timedelta(minutes=5)
+
+# 대기 예약이 만료되었을 때의 알림 메시지 형식
+EXPIRY_MESSAGE = "{machine_type} 대기 예약이 시간이 지나 취소되었습니다. 필요하면 다시 신청해주세요."
+
+
+def synchronized(method):
+    """
+    시스템 잠금을 잡은 상태로 메서드를 실행하는 데코레이터
+    
+    "빈 세탁기 찾기 → 배정"처럼 여러 단계로 이루어진 상태 변경이
+    다른 스레드(Flask 요청, 백그라운드 확인)와 섞이지 않도록 합니다.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def transactional(method):
+    """
+    시스템 잠금을 잡고 메서드 전체를 데이터베이스 트랜잭션 하나로 실행하는 데코레이터
+    
+    테이블 변경과 이벤트 저널 추가가 함께 커밋되거나 함께 취소되므로
+    테이블이 항상 저널의 투영(projection)으로 남습니다.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, self._transaction():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class WashingMachineSystem:
@@ -19,17 +71,70 @@ class WashingMachineSystem:
     SQLite 데이터베이스를 사용하여 데이터를 영구 저장합니다.
     """
     
-    def __init__(self, num_machines: int = 3, db_path: str = "washing_machine.db"):
+    def __init__(self, num_machines: int = 3, db_path: str = "washing_machine.db",
+                 fleet: Optional[List[Tuple[MachineType, int]]] = None):
         """
         시스템 초기화
         
         Args:
             num_machines: 세탁기 개수 (기본값: 3대)
             db_path: 데이터베이스 파일 경로
+            fleet: 기기별 (종류, 용량 kg) 리스트 (주어지면 num_machines 대신 사용)
         """
+        if fleet:
+            num_machines = len(fleet)
         self.db = Database(db_path)
         self.num_machines = num_machines
-        self.db.init_machines(num_machines)  # 데이터베이스에 세탁기 초기화
+        self.durations = dict(DEFAULT_DURATIONS)  # 기기 종류별 기본 소요 시간(분), 대기자 자동 시작에도 사용
+        self._lock = threading.RLock()  # 상태 변경 직렬화 (synchronized 참고)
+        self.db.init_machines(  # 데이터베이스에 세탁기 초기화
+            num_machines,
+            [(machine_type.value, capacity_kg) for machine_type, capacity_kg in fleet] if fleet else None
+        )
+        
+        # 이벤트 저널 (감사 기록/과거 상태 조회용, 조회는 테이블 기준): 스냅샷 + 이후 이벤트 재생으로 복원
+        self.journal = EventStore(self.db)
+        self.journal.load()
+        
+        # 기기 배정 엔진: 종류/용량별 빈 기기 목록과 대기열
+        self.matcher = MatchingEngine()
+        self.matcher.load(self.db.get_machines(), self.db.get_reservations())
+        
+        # 외부 채널 알림 발송기 (설정된 경우에만 지정, 큐에 넣기만 하므로 기다리지 않음)
+        self.notifier: Optional[NotificationDispatcher] = None
+        self._outbox: List[tuple] = []  # 커밋 후 발송기에 넘길 알림 (user_name, message, timestamp)
+        self._transaction_depth = 0
+    
+    @contextmanager
+    def _transaction(self):
+        """
+        데이터베이스 트랜잭션 (transactional 참고, 시스템 잠금을 잡은 상태에서 사용)
+        
+        시작할 때 다른 프로세스가 쓴 이벤트가 있으면 저널과 배정 엔진을 먼저 맞추고,
+        롤백되면 메모리 상태를 데이터베이스 기준으로 다시 불러옵니다.
+        """
+        outermost = self._transaction_depth == 0
+        self._transaction_depth += 1
+        try:
+            with self.db.transaction():
+                if outermost and self.journal.catch_up():
+                    self.matcher.load(self.db.get_machines(), self.db.get_reservations())
+                yield
+        except Exception:
+            if outermost:
+                self._outbox.clear()
+                self.journal.load()
+                self.matcher.load(self.db.get_machines(), self.db.get_reservations())
+            raise
+        finally:
+            self._transaction_depth -= 1
+        
+        # 커밋된 알림만 외부 채널로 보냄
+        if outermost and self._outbox:
+            outbox, self._outbox = self._outbox, []
+            if self.notifier:
+                for user_name, message, timestamp in outbox:
+                    self.notifier.submit(user_name, message, timestamp)
     
     def _load_machine_from_db(self, machine_data: dict) -> Machine:
         """
@@ -41,10 +146,16 @@ class WashingMachineSystem:
         Returns:
             Machine 객체
         """
-        machine = Machine(machine_data['machine_id'])
+        machine = Machine(
+            machine_data['machine_id'],
+            MachineType(machine_data['machine_type']),
+            machine_data['capacity_kg']
+        )
         machine.status = MachineStatus(machine_data['status'])
         machine.user_name = machine_data['user_name']
         machine.duration_minutes = machine_data['duration_minutes'] or 0
+        machine.usage_count = machine_data['usage_count']
+        machine.then_dry = bool(machine_data['then_dry'])
         
         if machine_data['start_time']:
             machine.start_time = datetime.fromisoformat(machine_data['start_time'])
@@ -53,74 +164,178 @@ class WashingMachineSystem:
         
         return machine
     
-    def get_available_machine(self) -> Optional[int]:
+    def get_available_machine(self, machine_type: MachineType = MachineType.WASHER,
+                              load_kg: int = 0) -> Optional[int]:
         """
-        사용 가능한 세탁기 찾기
+        배정할 빈 기기 찾기
+        
+        세탁물이 들어가는 가장 작은 용량 중 사용 횟수가 가장 적은 기기를 고릅니다.
+        
+        Args:
+            machine_type: 기기 종류
+            load_kg: 세탁물 무게 (kg)
         
         Returns:
-            사용 가능한 세탁기 번호. 없으면 None
+            기기 번호. 없으면 None
         """
-        machines = self.db.get_machines()
-        for machine_data in machines:
-            if machine_data['status'] == '사용 가능':
-                return machine_data['machine_id']
-        return None
+        return self.matcher.find(machine_type, load_kg)
     
-    def start_washing(self, user_name: str, duration_minutes: int = 30) -> dict:
+    @transactional
+    def start_washing(self, user_name: str, duration_minutes: Optional[int] = None,
+                      machine_type: str = MachineType.WASHER.value, load_kg: int = 0,
+                      then_dry: bool = False) -> dict:
         """
-        세탁 시작
+        세탁(또는 건조) 시작
         
-        사용 가능한 세탁기가 있으면 바로 시작하고,
+        맞는 빈 기기가 있으면 바로 시작하고,
         없으면 대기 예약을 생성합니다.
         
         Args:
             user_name: 사용자 이름
-            duration_minutes: 세탁 소요 시간 (기본 30분)
+            duration_minutes: 소요 시간 (없으면 기기 종류별 기본값, 세탁 30분)
+            machine_type: 기기 종류 ("세탁기" 또는 "건조기")
+            load_kg: 세탁물 무게 (kg)
+            then_dry: 세탁이 끝나고 옷을 가져갈 때 건조기를 이어서 배정할지 여부
         
         Returns:
             결과 정보가 담긴 딕셔너리
         """
+        try:
+            machine_type = MachineType(machine_type)
+        except ValueError:
+            return {
+                "success": False,
+                "message": f"알 수 없는 기기 종류입니다: {machine_type}"
+            }
+        then_dry = then_dry and machine_type == MachineType.WASHER
+        
+        # 세탁물이 들어갈 기기가 아예 없으면 예약도 받지 않음
+        for needed in [machine_type] + ([MachineType.DRYER] if then_dry else []):
+            if self.matcher.fit_capacity(needed, load_kg) is None:
+                return {
+                    "success": False,
+                    "message": f"{load_kg}kg 세탁물을 넣을 수 있는 {needed.value}가 없습니다."
+                }
+        duration_minutes = duration_minutes or self.durations[machine_type]
+        
         # 만료된 예약 제거
         self._clean_expired_reservations()
         
-        # 사용 가능한 세탁기 찾기
-        available_machine_id = self.get_available_machine()
-        
-        if available_machine_id:
-            # 바로 세탁 시작
-            start_time = datetime.now()
-            end_time = start_time + timedelta(minutes=duration_minutes)
-            
-            self.db.update_machine(
-                available_machine_id,
-                "사용 중",
-                user_name,
-                start_time,
-                end_time,
-                duration_minutes
-            )
-            
+        # 맞는 빈 기기에 바로 시작
+        machine_id = self._start_on_free_machine(user_name, machine_type, duration_minutes, load_kg, then_dry)
+        if machine_id:
             return {
                 "success": True,
-                "message": f"세탁기 {available_machine_id}번이 시작되었습니다!",
-                "machine_id": available_machine_id
-            }
-        else:
-            # 대기 예약 생성
-            reservation_time = datetime.now()
-            expiry_time = reservation_time + timedelta(minutes=5)
-            self.db.add_reservation(user_name, reservation_time, expiry_time)
-            
-            reservations = self.db.get_reservations()
-            queue_position = len(reservations)
-            
-            return {
-                "success": True,
-                "message": f"모든 세탁기가 사용 중입니다. 대기 예약이 생성되었습니다. (대기 순서: {queue_position}번째)",
-                "is_reservation": True,
-                "queue_position": queue_position
+                "message": f"{machine_type.value} {machine_id}번이 시작되었습니다!",
+                "machine_id": machine_id
             }
+        
+        # 대기 예약 생성
+        queue_position = self._reserve(user_name, machine_type, load_kg, then_dry)
+        return {
+            "success": True,
+            "message": f"모든 {machine_type.value}가 사용 중입니다. 대기 예약이 생성되었습니다. (대기 순서: {queue_position}번째)",
+            "is_reservation": True,
+            "queue_position": queue_position
+        }
+    
+    def _start_session(self, machine_id: int, user_name: str, duration_minutes: int, load_kg: int = 0,
+                       then_dry: bool = False, previous_user: Optional[str] = None,
+                       reservation_id: Optional[int] = None) -> bool:
+        """
+        기기에 사용자를 배정하고 저널과 배정 엔진에 반영
+        
+        Args:
+            machine_id: 기기 번호
+            user_name: 사용자 이름
+            duration_minutes: 소요 시간
+            load_kg: 세탁물 무게 (kg)
+            then_dry: 세탁 후 건조기 연결 여부
+            previous_user: 이 사용자가 쓰던 기기를 넘겨받는 경우
+            reservation_id: 예약자에게 배정하는 경우 예약 ID
+        
+        Returns:
+            배정 여부 (다른 프로세스가 먼저 배정했으면 False)
+        """
+        start_time = datetime.now()
+        end_time = start_time + timedelta(minutes=duration_minutes)
+        if not self.db.claim_machine(machine_id, user_name, start_time, end_time, duration_minutes,
+                                     load_kg, then_dry, previous_user):
+            return False
+        
+        self.matcher.acquire(machine_id)
+        machine = self.matcher.machines[machine_id]
+        payload = {
+            "machine_id": machine_id,
+            "user_name": user_name,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "duration_minutes": duration_minutes,
+            "machine_type": machine['machine_type'].value,
+            "capacity_kg": machine['capacity_kg'],
+            "load_kg": load_kg,
+            "then_dry": then_dry
+        }
+        if reservation_id is not None:
+            payload['reservation_id'] = reservation_id
+        self.journal.record(EventType.WASH_STARTED, **payload)
+        return True
+    
+    def _start_on_free_machine(self, user_name: str, machine_type: MachineType, duration_minutes: int,
+                               load_kg: int = 0, then_dry: bool = False) -> Optional[int]:
+        """
+        맞는 빈 기기를 찾아 바로 시작
+        
+        Returns:
+            시작한 기기 번호. 빈 기기가 없으면 None
+        """
+        while True:
+            machine_id = self.get_available_machine(machine_type, load_kg)
+            if machine_id is None:
+                return None
+            if self._start_session(machine_id, user_name, duration_minutes, load_kg, then_dry):
+                return machine_id
+            # 다른 프로세스가 먼저 배정한 기기: 데이터베이스 기준으로 색인을 다시 만들고 재시도
+            self.matcher.load(self.db.get_machines(), self.db.get_reservations())
     
+    def _reserve(self, user_name: str, machine_type: MachineType, load_kg: int = 0,
+                 then_dry: bool = False, expiry_time: Optional[datetime] = None) -> int:
+        """
+        대기 예약 생성
+        
+        Args:
+            expiry_time: 만료 시간 (없으면 지금부터 RESERVATION_EXPIRY 뒤)
+        
+        Returns:
+            같은 종류 기기의 대기 순서
+        """
+        reservation_time = datetime.now()
+        expiry_time = expiry_time or reservation_time + RESERVATION_EXPIRY
+        reservation_id = self.db.add_reservation(
+            user_name, reservation_time, expiry_time, machine_type.value, load_kg, then_dry
+        )
+        self.journal.record(
+            EventType.RESERVED,
+            reservation_id=reservation_id,
+            user_name=user_name,
+            reservation_time=reservation_time.isoformat(),
+            expiry_time=expiry_time.isoformat(),
+            machine_type=machine_type.value,
+            load_kg=load_kg,
+            then_dry=then_dry
+        )
+        self.matcher.enqueue({
+            "id": reservation_id,
+            "user_name": user_name,
+            "reservation_time": reservation_time.isoformat(),
+            "expiry_time": expiry_time.isoformat(),
+            "machine_type": machine_type.value,
+            "load_kg": load_kg,
+            "then_dry": int(then_dry)
+        })
+        return self.db.count_reservations(machine_type.value)
+    
+    @transactional
     def complete_washing(self, machine_id: int, user_name: str) -> dict:
         """
         세탁 완료 처리 및 옷 가져가기
@@ -132,8 +347,7 @@ class WashingMachineSystem:
         Returns:
             결과 정보가 담긴 딕셔너리
         """
-        machines = self.db.get_machines()
-        machine_data = next((m for m in machines if m['machine_id'] == machine_id), None)
+        machine_data = self.db.get_machine(machine_id)
         
         if not machine_data:
             return {
@@ -155,33 +369,28 @@ class WashingMachineSystem:
                 "message": "본인의 세탁물만 가져갈 수 있습니다."
             }
         
-        # 대기 예약이 있으면 다음 사용자에게 세탁기 할당
-        next_reservation = self.db.get_first_reservation()
-        
-        if next_reservation:
-            # 다음 사용자에게 세탁기 할당
-            start_time = datetime.now()
-            end_time = start_time + timedelta(minutes=30)  # 기본 30분
-            
-            self.db.update_machine(
-                machine_id,
-                "사용 중",
-                next_reservation['user_name'],
-                start_time,
-                end_time,
-                30
-            )
-            
-            # 예약 삭제
-            self.db.delete_reservation(next_reservation['id'])
-            
+        self.journal.record(EventType.COLLECTED, machine_id=machine_id, user_name=user_name)
+        
+        # 대기 예약이 있으면 다음 사용자에게 기기 할당 (같은 종류, 이 용량에 맞는 가장 오래된 예약)
+        next_reservation = self._take_next_reservation(machine_id)
+        machine_type = MachineType(machine_data['machine_type'])
+        
+        if next_reservation and self._start_session(
+            machine_id,
+            next_reservation['user_name'],
+            self.durations[machine_type],
+            next_reservation['load_kg'],
+            bool(next_reservation['then_dry']),
+            previous_user=user_name,
+            reservation_id=next_reservation['id']
+        ):
             # 다음 사용자에게 알림
             self._add_notification(
                 next_reservation['user_name'],
-                f"세탁기 {machine_id}번이 사용 가능합니다! 세탁이 자동으로 시작되었습니다."
+                HANDOVER_MESSAGES[machine_type].format(machine_id=machine_id)
             )
             
-            return {
+            result = {
                 "success": True,
                 "message": "세탁물을 가져가셨습니다. 다음 대기자가 세탁을 시작했습니다.",
                 "next_user": next_reservation['user_name']
@@ -189,43 +398,195 @@ class WashingMachineSystem:
         else:
             # 세탁기 리셋
             self.db.reset_machine(machine_id)
+            self.matcher.release(machine_id)
             
-            return {
+            result = {
                 "success": True,
                 "message": "세탁물을 가져가셨습니다."
             }
+        
+        # 세탁 후 건조를 요청했으면 건조기를 이어서 배정
+        if machine_data['then_dry']:
+            result['message'] += " " + self._chain_dryer(user_name, machine_data['load_kg'])
+        return result
+    
+    def _take_next_reservation(self, machine_id: int) -> Optional[dict]:
+        """
+        비게 된 기기를 받을 예약을 대기열에서 꺼내 삭제
+        
+        Args:
+            machine_id: 비게 된 기기 번호
+        
+        Returns:
+            예약 정보. 받을 예약이 없으면 None
+        """
+        while True:
+            reservation = self.matcher.next_reservation(machine_id)
+            if reservation is None:
+                return None
+            self.matcher.remove_reservations([reservation['id']])
+            if self.db.delete_reservation(reservation['id']):
+                return reservation
+            # 다른 프로세스가 이미 처리한 예약이면 다음 예약으로
+    
+    def _chain_dryer(self, user_name: str, load_kg: int) -> str:
+        """
+        세탁을 마친 사용자에게 건조기 배정 (빈 건조기가 없으면 건조기 대기 예약)
+        
+        Args:
+            user_name: 사용자 이름
+            load_kg: 세탁물 무게 (kg)
+        
+        Returns:
+            결과 메시지
+        """
+        dryer_id = self._start_on_free_machine(
+            user_name, MachineType.DRYER, self.durations[MachineType.DRYER], load_kg
+        )
+        if dryer_id:
+            return f"건조기 {dryer_id}번에서 건조가 시작되었습니다."
+        if self.matcher.fit_capacity(MachineType.DRYER, load_kg) is None:
+            return "세탁물을 넣을 수 있는 건조기가 없어 건조 예약을 만들지 못했습니다."
+        queue_position = self._reserve(user_name, MachineType.DRYER, load_kg,
+                                       expiry_time=self._dryer_wait_deadline(load_kg))
+        return f"모든 건조기가 사용 중입니다. 건조 대기 예약이 생성되었습니다. (대기 순서: {queue_position}번째)"
     
-    def check_and_update_status(self):
+    def _dryer_wait_deadline(self, load_kg: int) -> datetime:
+        """
+        세탁 후 이어지는 건조 대기 예약의 만료 시간
+        
+        건조기가 모두 사용 중일 때 만들어지므로, 일반 예약처럼 5분 뒤에 만료되면
+        건조기가 비기 전에 사라집니다. 맞는 건조기 중 가장 먼저 끝나는 시간부터
+        앞선 대기자가 건조기를 한 번씩 쓰는 시간에 건조 한 번만큼의 여유를 더합니다.
+        
+        Args:
+            load_kg: 세탁물 무게 (kg)
+        
+        Returns:
+            만료 시간
+        """
+        now = datetime.now()
+        capacity = self.matcher.fit_capacity(MachineType.DRYER, load_kg)
+        busy = self.db.get_busy_machine_summary(MachineType.DRYER.value, capacity)
+        earliest = now
+        if busy['earliest_end_time']:
+            earliest = max(now, datetime.fromisoformat(busy['earliest_end_time']))
+        rounds = self.matcher.waiting_count(MachineType.DRYER) // max(1, busy['count']) + 1
+        return earliest + timedelta(minutes=self.durations[MachineType.DRYER] * rounds)
+    
+    def check_and_update_status(self) -> int:
         """
         세탁기 상태를 확인하고 업데이트
         
         시간이 지나서 완료된 세탁기를 찾아 상태를 업데이트하고,
-        사용자에게 알림을 보냅니다.
+        사용자에게 알림을 보냅니다. 만료된 대기 예약도 함께 정리합니다.
         이 함수는 주기적으로 호출되어야 합니다.
+        
+        상태 조회 요청마다 호출되므로, 먼저 읽기 전용으로 할 일이 있는지 확인하고
+        있을 때만 쓰기 트랜잭션을 시작합니다 (여러 웹 프로세스의 조회가 쓰기 잠금을 기다리지 않도록).
+        
+        Returns:
+            완료 처리된 세탁기 수
         """
-        current_time = datetime.now()
-        machines = self.db.get_machines()
-        
-        for machine_data in machines:
-            # 세탁 중이고 시간이 지났으면 완료 처리
-            if machine_data['status'] == '사용 중' and machine_data['end_time']:
-                end_time = datetime.fromisoformat(machine_data['end_time'])
-                if current_time >= end_time:
-                    # 완료 상태로 변경
-                    self.db.update_machine(
-                        machine_data['machine_id'],
-                        "완료",
-                        machine_data['user_name'],
-                        datetime.fromisoformat(machine_data['start_time']) if machine_data['start_time'] else None,
-                        end_time,
-                        machine_data['duration_minutes']
-                    )
-                    # 사용자에게 알림
-                    self._add_notification(
-                        machine_data['user_name'],
-                        f"세탁기 {machine_data['machine_id']}번 세탁이 완료되었습니다! 옷을 가져가주세요."
-                    )
+        if not self.db.has_due_updates(datetime.now()):
+            return 0
+        return self._apply_due_updates()
+    
+    @transactional
+    def _apply_due_updates(self) -> int:
+        """
+        완료된 세탁기와 만료된 예약 처리 (check_and_update_status 참고)
+        
+        Returns:
+            완료 처리된 세탁기 수
+        """
+        # 세탁 중이고 시간이 지난 세탁기를 한 번에 완료 처리하고 사용자에게 알림
+        now = datetime.now()
+        finished = self.db.complete_finished_machines(now, COMPLETION_MESSAGES)
+        
+        events = []
+        for machine_data in finished:
+            message = COMPLETION_MESSAGES[machine_data['machine_type']].format(machine_id=machine_data['machine_id'])
+            events.append((EventType.WASH_COMPLETED, {"machine_id": machine_data['machine_id']}))
+            events.append((EventType.NOTIFICATION_SENT, {
+                "user_name": machine_data['user_name'],
+                "message": message
+            }))
+            self._outbox.append((machine_data['user_name'], message, now))
+        self.journal.record_many(events)
+        
+        # 만료된 예약도 바로 정리해 예약자가 새 예약을 하기 전에 알림을 받도록 함
+        self._clean_expired_reservations()
+        return len(finished)
+    
+    @transactional
+    def catch_up(self) -> dict:
+        """
+        서버가 멈춰 있던 동안 밀린 완료 처리와 예약 만료를 한 번에 처리
+        
+        시작 직후 한 번 호출합니다. 각각 UPDATE/DELETE 한 번으로 처리되므로
+        오래 멈춰 있었어도 세탁기 수에 비례한 쿼리가 생기지 않습니다.
+        
+        Returns:
+            완료 처리된 세탁기 수와 만료된 예약 수가 담긴 딕셔너리
+        """
+        expired = self._clean_expired_reservations()
+        return {
+            "completed": self.check_and_update_status(),
+            "expired": expired
+        }
+    
+    @transactional
+    def apply_telemetry(self, machine_id: int, end_time: datetime) -> bool:
+        """
+        세탁기가 보고한 실제 진행 상황으로 종료 시간 보정
+        
+        완료 처리는 check_and_update_status에서 평소처럼 이루어집니다.
+        
+        Args:
+            machine_id: 세탁기 번호
+            end_time: 보고값으로 계산한 종료 시간
+        
+        Returns:
+            보정 여부 (세탁 중이 아니면 False)
+        """
+        if not self.db.update_machine_end_time(machine_id, end_time):
+            return False
+        self.journal.record(EventType.END_TIME_ADJUSTED, machine_id=machine_id, end_time=end_time.isoformat())
+        return True
+    
+    def store_telemetry(self, buckets: List[tuple]):
+        """
+        다운샘플링된 텔레메트리 저장
+        
+        Args:
+            buckets: (machine_id, bucket_start, samples, avg_progress, min_remaining_seconds) 리스트
+        """
+        self.db.add_telemetry_buckets([tuple(bucket) for bucket in buckets])
+    
+    def get_idempotency_key(self, key: str) -> Optional[dict]:
+        """멱등성 키로 저장된 응답 조회 (Database.get_idempotency_key 참고)"""
+        return self.db.get_idempotency_key(key)
     
+    def claim_idempotency_key(self, key: str, fingerprint: str, created_at: datetime,
+                              stale_before: datetime) -> bool:
+        """멱등성 키를 처리 중으로 선점 (Database.claim_idempotency_key 참고)"""
+        return self.db.claim_idempotency_key(key, fingerprint, created_at, stale_before)
+    
+    def save_idempotency_key(self, key: str, fingerprint: str, status: int, response: str,
+                             created_at: datetime):
+        """멱등성 키와 응답 저장 (Database.save_idempotency_key 참고)"""
+        self.db.save_idempotency_key(key, fingerprint, status, response, created_at)
+    
+    def release_idempotency_key(self, key: str):
+        """멱등성 키의 처리 중 표시 삭제 (Database.release_idempotency_key 참고)"""
+        self.db.release_idempotency_key(key)
+    
+    def delete_idempotency_keys(self, before: datetime) -> int:
+        """오래된 멱등성 키 삭제 (Database.delete_idempotency_keys 참고)"""
+        return self.db.delete_idempotency_keys(before)
+    
+    @synchronized
     def get_status(self) -> dict:
         """
         전체 시스템 상태 조회
@@ -233,27 +594,37 @@ class WashingMachineSystem:
         Returns:
             모든 세탁기 상태와 예약 목록이 담긴 딕셔너리
         """
-        # 상태 업데이트
+        # 상태 업데이트 (만료된 예약 정리 포함)
         self.check_and_update_status()
         
-        # 만료된 예약 제거
-        self._clean_expired_reservations()
+        return self._build_status(self.db.get_machines(), self.db.get_reservations())
+    
+    def _build_status(self, machines_data: List[dict], reservations_data: List[dict]) -> dict:
+        """
+        데이터베이스 조회 결과로 상태 응답 생성
         
-        # 데이터베이스에서 세탁기 정보 가져오기
-        machines_data = self.db.get_machines()
-        machines = []
+        Args:
+            machines_data: 세탁기 행 리스트
+            reservations_data: 예약 행 리스트
         
+        Returns:
+            모든 세탁기 상태와 예약 목록이 담긴 딕셔너리
+        """
+        machines = []
         for machine_data in machines_data:
             machine = self._load_machine_from_db(machine_data)
             machines.append(machine.to_dict())
         
-        # 예약 정보 가져오기
-        reservations_data = self.db.get_reservations()
         reservations = []
         for res_data in reservations_data:
             reservation_time = datetime.fromisoformat(res_data['reservation_time'])
             expiry_time = datetime.fromisoformat(res_data['expiry_time'])
-            res = Reservation(res_data['user_name'], reservation_time)
+            res = Reservation(
+                res_data['user_name'],
+                reservation_time,
+                MachineType(res_data['machine_type']),
+                res_data['load_kg']
+            )
             res.expiry_time = expiry_time
             reservations.append(res.to_dict())
         
@@ -263,7 +634,77 @@ class WashingMachineSystem:
             "total_machines": len(machines),
             "available_count": sum(1 for m in machines if m['status'] == '사용 가능'),
             "in_use_count": sum(1 for m in machines if m['status'] == '사용 중'),
-            "completed_count": sum(1 for m in machines if m['status'] == '완료')
+            "completed_count": sum(1 for m in machines if m['status'] == '완료'),
+            "by_type": {
+                machine_type.value: {
+                    "total": sum(1 for m in machines if m['machine_type'] == machine_type.value),
+                    "available": sum(
+                        1 for m in machines
+                        if m['machine_type'] == machine_type.value and m['status'] == '사용 가능'
+                    )
+                }
+                for machine_type in MachineType
+            }
+        }
+    
+    @synchronized
+    def get_dashboard(self, user_name: Optional[str] = None) -> dict:
+        """
+        대시보드 화면에 필요한 정보를 한 번에 조회
+        
+        전체 상태, 사용자의 알림, 대기 순서, 사용자의 세탁기를
+        하나의 읽기 트랜잭션으로 가져오므로 서로 어긋나지 않습니다.
+        
+        Args:
+            user_name: 사용자 이름 (없으면 전체 상태만 반환)
+        
+        Returns:
+            상태 정보와 사용자별 정보가 담긴 딕셔너리
+        """
+        self.check_and_update_status()
+        
+        data = self.db.get_dashboard_data(user_name)
+        dashboard = self._build_status(data['machines'], data['reservations'])
+        
+        # 대기 순서는 start_washing 응답과 같이 같은 종류 기기를 기다리는 예약 중 순서
+        queue_position = None
+        mine = next((r for r in data['reservations'] if user_name and r['user_name'] == user_name), None)
+        if mine is not None:
+            same_type = [r for r in data['reservations'] if r['machine_type'] == mine['machine_type']]
+            queue_position = same_type.index(mine) + 1
+        
+        dashboard.update({
+            "user_name": user_name,
+            "notifications": [
+                {
+                    "user_name": notif['user_name'],
+                    "message": notif['message'],
+                    "timestamp": notif['timestamp']
+                }
+                for notif in data['notifications']
+            ],
+            "queue_position": queue_position,
+            "my_machines": [
+                m for m in dashboard['machines'] if user_name and m['user_name'] == user_name
+            ]
+        })
+        return dashboard
+    
+    def get_state_at(self, when: datetime) -> dict:
+        """
+        과거 특정 시점의 시스템 상태 재구성
+        
+        Args:
+            when: 재구성할 시점
+        
+        Returns:
+            해당 시점의 세탁기 상태와 예약 목록이 담긴 딕셔너리
+        """
+        snapshot = self.journal.state_at(when).to_dict()
+        return {
+            "at": when.isoformat(),
+            "machines": snapshot['machines'],
+            "reservations": snapshot['reservations']
         }
     
     def get_notifications(self, user_name: str) -> List[dict]:
@@ -295,6 +736,7 @@ class WashingMachineSystem:
         """
         self.db.clear_notifications(user_name)
     
+    @transactional
     def cancel_reservation(self, user_name: str) -> dict:
         """
         예약 취소
@@ -305,11 +747,9 @@ class WashingMachineSystem:
         Returns:
             결과 정보가 담긴 딕셔너리
         """
-        reservations = self.db.get_reservations()
-        user_reservations = [r for r in reservations if r['user_name'] == user_name]
-        
-        if user_reservations:
-            self.db.delete_reservations_by_user(user_name)
+        if self.db.delete_reservations_by_user(user_name) > 0:
+            self.matcher.remove_user(user_name)
+            self.journal.record(EventType.RESERVATION_CANCELLED, user_name=user_name)
             return {
                 "success": True,
                 "message": "예약이 취소되었습니다."
@@ -320,9 +760,23 @@ class WashingMachineSystem:
                 "message": "취소할 예약이 없습니다."
             }
     
-    def _clean_expired_reservations(self):
-        """만료된 예약 자동 제거"""
-        self.db.delete_expired_reservations()
+    def _clean_expired_reservations(self) -> int:
+        """
+        만료된 예약 자동 제거 (예약자에게 알림)
+        
+        Returns:
+            제거된 예약 수
+        """
+        expired_ids = self.db.delete_expired_reservations()
+        if expired_ids:
+            expired = self.matcher.remove_reservations(expired_ids)
+            self.journal.record(EventType.RESERVATION_EXPIRED, reservation_ids=expired_ids)
+            for reservation in expired:
+                self._add_notification(
+                    reservation['user_name'],
+                    EXPIRY_MESSAGE.format(machine_type=reservation['machine_type'])
+                )
+        return len(expired_ids)
     
     def _add_notification(self, user_name: str, message: str):
         """
@@ -332,5 +786,8 @@ class WashingMachineSystem:
             user_name: 사용자 이름
             message: 알림 메시지
         """
-        self.db.add_notification(user_name, message, datetime.now())
+        now = datetime.now()
+        self.db.add_notification(user_name, message, now)
+        self.journal.record(EventType.NOTIFICATION_SENT, user_name=user_name, message=message)
+        self._outbox.append((user_name, message, now))
 